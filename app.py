@@ -1,11 +1,46 @@
 from dotenv import load_dotenv
 import os
 
-from flask import Flask, request, jsonify, redirect, url_for
+import base64
+import csv
+import functools
+import io
+import json
+import logging
+import queue
+import threading
+import time
+import zlib
+from collections import deque, OrderedDict
+from logging.handlers import RotatingFileHandler
+
+from flask import Flask, request, jsonify, redirect, url_for, g, has_app_context, has_request_context, Response, make_response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_cors import CORS
+import click
 import mysql.connector
-from datetime import datetime
+from mysql.connector.constants import FieldFlag, FieldType
+from mysql.connector.cursor import MySQLCursorPrepared
+try:
+    from mysql.connector.connection_cext import CMySQLConnection
+    from mysql.connector.cursor_cext import CMySQLCursorPrepared
+except ImportError:
+    # C extension not installed, every connection is pure Python
+    CMySQLConnection = CMySQLCursorPrepared = None
+try:
+    import brotli
+except ImportError:
+    # Optional, responses fall back to gzip
+    brotli = None
+try:
+    import orjson
+except ImportError:
+    # Optional, JSON falls back to Flask's encoder
+    orjson = None
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,19 +54,1263 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+#####################################################################################################
+# JSON encoding
+
+# With the optional `orjson` package installed (and FAST_JSON not false),
+# responses are encoded by orjson instead of the standard library. The output
+# matches Flask's encoder: keys sorted, dates as HTTP dates and Decimals as
+# strings. Only dates, Decimals and other non-JSON types take the Python
+# fallback, and a column holds few distinct dates, so their formatting is
+# cached.
+FAST_JSON = os.getenv('FAST_JSON', 'true').lower() == 'true'
+
+cached_http_date = functools.lru_cache(maxsize=4096)(http_date)
+
+def json_default(value):
+    if isinstance(value, (date, datetime)):
+        return cached_http_date(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    return DefaultJSONProvider.default(value)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        # indent (debug responses) and custom encoders are left to the standard library
+        if kwargs.get('indent') or 'default' in kwargs or 'cls' in kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=json_default, option=self.OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    # Skips the str round trip of DefaultJSONProvider.response
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(obj)
+        body = orjson.dumps(obj, default=json_default, option=self.OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+if orjson is not None and FAST_JSON:
+    app.json = OrjsonProvider(app)
+
+#####################################################################################################
+# Connection pool
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+# Callbacks run after every statement executed on a pooled connection, as
+# listener(statement, params, elapsed_seconds, rowcount)
+statement_listeners = []
+
+def notify_statement(statement, params, elapsed, rowcount):
+    for listener in statement_listeners:
+        try:
+            listener(statement, params, elapsed, rowcount)
+        except Exception as e:
+            print(e)
+
+
+# Cursor wrapper that times each statement and reports it to the listeners
+class TracedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            notify_statement(operation, params, time.perf_counter() - started, self._cursor.rowcount)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            notify_statement(operation, seq_params, time.perf_counter() - started, self._cursor.rowcount)
+
+
+def prepared_cursor_class(raw):
+    if CMySQLConnection is not None and isinstance(raw, CMySQLConnection):
+        return CMySQLCursorPrepared
+    return MySQLCursorPrepared
+
+
+# Server-side prepared statements of one connection, keyed by SQL text. A
+# prepared cursor only skips the PREPARE when it is executed again with the
+# very same string object, so each entry keeps the string it was prepared
+# from. The least recently used statement is deallocated past maxsize.
+class PreparedStatementCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, raw, statement):
+        entry = self._entries.get(statement)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(statement)
+            return entry
+
+        self.misses += 1
+        entry = (raw.cursor(cursor_class=prepared_cursor_class(raw)), statement)
+        self._entries[statement] = entry
+        if len(self._entries) > self.maxsize:
+            _, (cursor, _) = self._entries.popitem(last=False)
+            cursor.close()
+        return entry
+
+
+def decode_text(value):
+    return value.decode('utf-8')
+
+def decode_decimal(value):
+    return Decimal(value.decode('ascii') if isinstance(value, (bytes, bytearray)) else value)
+
+def decode_bit(value):
+    return int.from_bytes(value, 'big')
+
+# Decoders that turn prepared statement values into the Python type of their
+# column, by MySQL field type, with the raw types that still need decoding.
+# Integers, floats and temporal columns arrive typed from the binary protocol;
+# any other non-binary column is text that may arrive as bytes.
+COLUMN_DECODERS = {
+    FieldType.DECIMAL: (decode_decimal, (str, bytes, bytearray)),
+    FieldType.NEWDECIMAL: (decode_decimal, (str, bytes, bytearray)),
+    FieldType.JSON: (json.loads, (str, bytes, bytearray)),
+    FieldType.BIT: (decode_bit, (bytes, bytearray)),
+}
+TEXT_DECODER = (decode_text, (bytes, bytearray))
+
+
+# Cursor for conn.cursor(prepared=True). Each statement runs through the
+# connection's cached prepared statement for that SQL text, and its rows are
+# read straight away (the prepared cursors are unbuffered and share the
+# connection), so it behaves like the buffered cursors the routes expect.
+# Every value is mapped to the Python type of its column (see COLUMN_DECODERS),
+# and rows come back as dicts keyed by column name, or tuples.
+class PreparedCursor:
+    def __init__(self, conn, dictionary=False):
+        self._conn = conn
+        self._dictionary = dictionary
+        self._rows = []
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+        self.column_names = ()
+
+    def execute(self, operation, params=()):
+        if self._conn.prepares_statements:
+            cursor, operation = self._conn.prepared_statement(operation)
+            self._read(cursor, operation, params)
+            return
+
+        # DB_PREPARED_STATEMENTS=false, to compare against the text protocol
+        cursor = self._conn.plain_cursor()
+        try:
+            self._read(cursor, operation, params)
+        finally:
+            cursor.close()
+
+    def _read(self, cursor, operation, params):
+        cursor.execute(operation, tuple(params or ()))
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+        self.description = cursor.description
+        self._rows = []
+        if self.description:
+            self.column_names = tuple(column[0] for column in self.description)
+            self._rows = self._map_rows(cursor.fetchall())
+            self.rowcount = len(self._rows)
+
+    # Bulk writes keep the client-side multi-row INSERT rewrite of a plain cursor
+    def executemany(self, operation, seq_params):
+        cursor = self._conn.plain_cursor()
+        try:
+            cursor.executemany(operation, seq_params)
+            self.rowcount = cursor.rowcount
+            self.lastrowid = cursor.lastrowid
+        finally:
+            cursor.close()
+        self.description = None
+        self._rows = []
+
+    # The driver returns a column's values in one raw type, so the first
+    # non-NULL value tells whether the column needs decoding; most results
+    # then pass through without touching each value
+    def _map_rows(self, rows):
+        decode = []
+        for index, column in enumerate(self.description):
+            decoder, raw_types = COLUMN_DECODERS.get(column[1], TEXT_DECODER)
+            if decoder is decode_text and column[7] & FieldFlag.BINARY:
+                continue
+            value = next((row[index] for row in rows if row[index] is not None), None)
+            if isinstance(value, raw_types):
+                decode.append((index, decoder, raw_types))
+        if decode:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for index, decoder, raw_types in decode:
+                    if isinstance(row[index], raw_types):
+                        row[index] = decoder(row[index])
+        if self._dictionary:
+            return [dict(zip(self.column_names, row)) for row in rows]
+        return [tuple(row) for row in rows] if decode else list(rows)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    # The prepared statements stay cached on the connection
+    def close(self):
+        self._rows = []
+
+
+# A connection checked out of the pool. Behaves like the underlying
+# mysql.connector connection, except close() hands it back to the pool.
+class PooledConnection:
+    def __init__(self, pool, raw, created_at, statements):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._statements = statements
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise mysql.connector.errors.OperationalError("Connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    @property
+    def closed(self):
+        return self._raw is None
+
+    def cursor(self, *args, prepared=False, **kwargs):
+        if prepared:
+            return TracedCursor(PreparedCursor(self, **kwargs))
+        return TracedCursor(self.__getattr__('cursor')(*args, **kwargs))
+
+    @property
+    def prepares_statements(self):
+        return self._pool.prepare_statements
+
+    def plain_cursor(self):
+        return self.__getattr__('cursor')()
+
+    def prepared_statement(self, statement):
+        if self._raw is None:
+            raise mysql.connector.errors.OperationalError("Connection already returned to the pool")
+        return self._statements.get(self._raw, statement)
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._pool.release(raw, self._created_at)
+
+
+class ConnectionPool:
+    def __init__(self, size, max_overflow, timeout, recycle, pre_ping, prepare_statements=True, prepared_cache_size=256, **connect_args):
+        self.size = size
+        self.prepare_statements = prepare_statements
+        self.prepared_cache_size = prepared_cache_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._connect_args = connect_args
+
+        self._idle = deque()
+        self._cond = threading.Condition()
+        self._opened = 0
+        self._in_use = 0
+        self._waiting = 0
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._invalidated = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        # id(raw connection) -> its PreparedStatementCache
+        self._statements = {}
+
+    def _connect(self):
+        return mysql.connector.connect(**self._connect_args), time.monotonic()
+
+    def _discard(self, raw):
+        # Closing the connection deallocates its prepared statements on the server
+        with self._cond:
+            self._statements.pop(id(raw), None)
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        raw = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                    break
+                if self._opened < self.size + self.max_overflow:
+                    # Reserve the slot now, open the socket outside the lock
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection "
+                        f"(size={self.size}, overflow={self.max_overflow})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            if raw is None:
+                raw, created_at = self._connect()
+            elif self.recycle and time.monotonic() - created_at > self.recycle:
+                self._discard(raw)
+                raw, created_at = self._connect()
+                with self._cond:
+                    self._recycled += 1
+            elif self.pre_ping and not raw.is_connected():
+                self._discard(raw)
+                raw, created_at = self._connect()
+                with self._cond:
+                    self._invalidated += 1
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            statements = self._statements.get(id(raw))
+            if statements is None:
+                statements = self._statements[id(raw)] = PreparedStatementCache(self.prepared_cache_size)
+
+        return PooledConnection(self, raw, created_at, statements)
+
+    def release(self, raw, created_at):
+        healthy = True
+        try:
+            # Never hand the next request a half-finished transaction
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and self._opened <= self.size:
+                self._idle.append((raw, created_at))
+                raw = None
+            else:
+                self._opened -= 1
+            self._cond.notify()
+
+        if raw is not None:
+            self._discard(raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "maxOverflow": self.max_overflow,
+                "opened": self._opened,
+                "idle": len(self._idle),
+                "inUse": self._in_use,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "invalidated": self._invalidated,
+                "waitTimeTotal": round(self._wait_total, 6),
+                "waitTimeMax": round(self._wait_max, 6),
+                "waitTimeAvg": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "preparedStatements": sum(len(statements) for statements in self._statements.values()),
+                "preparedHits": sum(statements.hits for statements in self._statements.values()),
+                "preparedMisses": sum(statements.misses for statements in self._statements.values()),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    size=int(os.getenv('DB_POOL_SIZE', 10)),
+                    max_overflow=int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),
+                    timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+                    recycle=float(os.getenv('DB_POOL_RECYCLE', 3600)),
+                    pre_ping=os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+                    prepare_statements=os.getenv('DB_PREPARED_STATEMENTS', 'true').lower() == 'true',
+                    prepared_cache_size=int(os.getenv('DB_PREPARED_CACHE_SIZE', 256)),
+                    host=os.getenv('HOST'),
+                    user=os.getenv('USERNAME'),
+                    password=os.getenv('PASSWORD'),
+                    database='ourvle',
+                    # Connections are shared by several cursors per request,
+                    # so cursors must not leave unread rows on the wire
+                    buffered=True
+                )
+    return _pool
+
+
+#####################################################################################################
+# Request metrics
+
+# Count, sum and the most recent samples of one measurement. Quantiles are
+# computed over the sample window when /metrics is scraped.
+class MetricWindow:
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self, points):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [(point, 0.0) for point in points]
+        return [(point, ordered[min(len(ordered) - 1, int(point * len(ordered)))]) for point in points]
+
+
+class RequestMetrics:
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    # name -> (help text, per-route measurement)
+    SUMMARIES = {
+        'http_request_duration_seconds': "Request latency",
+        'http_request_db_statements': "SQL statements executed per request",
+        'http_request_db_seconds': "Time spent executing SQL per request",
+        'http_response_size_bytes': "Response body size as sent (unknown for streamed bodies)",
+    }
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._routes = {}
+        self._acquire = MetricWindow(window)
+        self._compression = {}
+
+    def observe_request(self, method, route, status, duration, statements, db_time, size):
+        with self._lock:
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            windows = self._routes.get((method, route))
+            if windows is None:
+                windows = self._routes[(method, route)] = {name: MetricWindow(self.window) for name in self.SUMMARIES}
+            windows['http_request_duration_seconds'].observe(duration)
+            windows['http_request_db_statements'].observe(statements)
+            windows['http_request_db_seconds'].observe(db_time)
+            if size is not None:
+                windows['http_response_size_bytes'].observe(size)
+
+    def observe_acquire(self, elapsed):
+        with self._lock:
+            self._acquire.observe(elapsed)
+
+    def observe_compression(self, route, encoding, uncompressed, compressed):
+        with self._lock:
+            totals = self._compression.setdefault((route, encoding), [0, 0, 0])
+            totals[0] += 1
+            totals[1] += uncompressed
+            totals[2] += compressed
+
+    # Prometheus text exposition format
+    def render(self):
+        lines = []
+        with self._lock:
+            lines.append("# HELP http_requests_total Requests handled, by route and status")
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, status), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            for name, help_text in self.SUMMARIES.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} summary")
+                for (method, route), windows in sorted(self._routes.items()):
+                    labels = f'method="{method}",route="{route}"'
+                    lines.extend(self._summary_lines(name, labels, windows[name]))
+
+            lines.append("# HELP db_pool_acquire_seconds Time to check a connection out of the pool")
+            lines.append("# TYPE db_pool_acquire_seconds summary")
+            lines.extend(self._summary_lines('db_pool_acquire_seconds', '', self._acquire))
+
+            counters = (
+                ('http_responses_compressed_total', "Responses sent compressed", lambda totals: totals[0]),
+                ('http_response_uncompressed_bytes_total', "Body bytes before compression", lambda totals: totals[1]),
+                ('http_response_compressed_bytes_total', "Body bytes sent after compression", lambda totals: totals[2]),
+                ('http_response_compression_saved_bytes_total', "Body bytes saved by compression", lambda totals: totals[1] - totals[2]),
+            )
+            for name, help_text, value in counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for (route, encoding), totals in sorted(self._compression.items()):
+                    lines.append(f'{name}{{route="{route}",encoding="{encoding}"}} {value(totals)}')
+        return "\n".join(lines) + "\n"
+
+    def _summary_lines(self, name, labels, window):
+        separator = ',' if labels else ''
+        for point, value in window.quantiles(self.QUANTILES):
+            yield f'{name}{{{labels}{separator}quantile="{point}"}} {value:g}'
+        yield f'{name}_sum{{{labels}}} {window.total:g}' if labels else f'{name}_sum {window.total:g}'
+        yield f'{name}_count{{{labels}}} {window.count}' if labels else f'{name}_count {window.count}'
+
+
+request_metrics = RequestMetrics(window=int(os.getenv('METRICS_WINDOW', 1000)))
+
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    g.metrics_statements = 0
+    g.metrics_db_time = 0.0
+
+
+def count_request_statement(statement, params, elapsed, rowcount):
+    if has_app_context() and 'metrics_started' in g:
+        g.metrics_statements += 1
+        g.metrics_db_time += elapsed
+
+statement_listeners.append(count_request_statement)
+
+
+# Registered before the unit-of-work hook so it runs after it (after_request
+# runs in reverse order) and the commit is part of the measured latency
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('metrics_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        method, status = request.method, response.status_code
+        if response.is_streamed:
+            # A streamed body runs its statements after this hook, so the
+            # request is observed once the response has been sent
+            metrics = g._get_current_object()
+            response.call_on_close(lambda: request_metrics.observe_request(
+                method, route, status, time.perf_counter() - started,
+                metrics.metrics_statements, metrics.metrics_db_time, None
+            ))
+        else:
+            request_metrics.observe_request(
+                method, route, status, time.perf_counter() - started,
+                g.metrics_statements, g.metrics_db_time, response.calculate_content_length()
+            )
+    return response
+
+
+#####################################################################################################
+# Slow-query log
+
+# Statements slower than SLOW_QUERY_THRESHOLD seconds are written, one JSON
+# object per line, to a rotating log with the route that ran them and their
+# EXPLAIN plan. The EXPLAIN runs on a background thread with its own pool
+# connection, so the request that ran the slow statement does not wait for it.
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.5))
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'slow_queries.log')
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+
+slow_query_logger = logging.getLogger('ourvle.slow_queries')
+slow_query_logger.propagate = False
+slow_query_queue = queue.Queue(maxsize=1000)
+_slow_query_worker = None
+_slow_query_worker_lock = threading.Lock()
+
+
+def record_slow_query(statement, params, elapsed, rowcount):
+    if SLOW_QUERY_THRESHOLD <= 0 or elapsed < SLOW_QUERY_THRESHOLD:
+        return
+    statement = ' '.join(statement.split())
+    # The worker's own EXPLAINs go through traced cursors too
+    if statement.upper().startswith('EXPLAIN'):
+        return
+
+    entry = {
+        "time": datetime.now().isoformat(timespec='milliseconds'),
+        "route": None,
+        "method": None,
+        "elapsed": round(elapsed, 6),
+        "rowcount": rowcount,
+        "statement": statement,
+        # Never write passwords to the log
+        "params": '<redacted>' if 'password' in statement.lower() else params,
+    }
+    if has_request_context():
+        entry['route'] = request.url_rule.rule if request.url_rule else request.path
+        entry['method'] = request.method
+
+    start_slow_query_worker()
+    try:
+        slow_query_queue.put_nowait(entry)
+    except queue.Full:
+        print("Slow-query log queue is full, dropping entry")
+
+statement_listeners.append(record_slow_query)
+
+
+def start_slow_query_worker():
+    global _slow_query_worker
+    if _slow_query_worker is not None:
+        return
+    with _slow_query_worker_lock:
+        if _slow_query_worker is None:
+            if not slow_query_logger.handlers:
+                handler = RotatingFileHandler(
+                    SLOW_QUERY_LOG,
+                    maxBytes=int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024)),
+                    backupCount=int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 5))
+                )
+                slow_query_logger.addHandler(handler)
+                slow_query_logger.setLevel(logging.INFO)
+            _slow_query_worker = threading.Thread(target=slow_query_worker, name='slow-query-log', daemon=True)
+            _slow_query_worker.start()
+
+
+def slow_query_worker():
+    while True:
+        entry = slow_query_queue.get()
+        try:
+            entry['plan'] = explain_statement(entry) if SLOW_QUERY_EXPLAIN else None
+        except Exception as e:
+            entry['plan'] = None
+            entry['planError'] = str(e)
+        slow_query_logger.info(json.dumps(entry, default=str))
+
+
+# EXPLAIN a logged statement. Bulk statements (executemany) and statements
+# whose parameters were redacted cannot be replayed, so they have no plan.
+def explain_statement(entry):
+    params = entry['params']
+    if params == '<redacted>' or (isinstance(params, list) and params and isinstance(params[0], (list, tuple, dict))):
+        return None
+    if not entry['statement'].upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')):
+        return None
+
+    conn = get_pool().acquire()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("EXPLAIN " + entry['statement'], params)
+        plan = cursor.fetchall()
+        cursor.close()
+        # Don't leave the EXPLAIN of a write holding locks
+        conn.rollback()
+        return plan
+    finally:
+        conn.close()
+
+
+# Newest entries first, read back from the current log file
+def read_slow_queries(route=None, min_elapsed=0.0, limit=100):
+    try:
+        with open(SLOW_QUERY_LOG) as log:
+            lines = log.readlines()
+    except FileNotFoundError:
+        return []
+
+    entries = []
+    for line in reversed(lines):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if route and entry.get('route') != route:
+            continue
+        if entry.get('elapsed', 0) < min_elapsed:
+            continue
+        entries.append(entry)
+        if len(entries) >= limit:
+            break
+    return entries
+
+
+#####################################################################################################
+# Response compression
+
+# Bodies of at least COMPRESS_MIN_SIZE bytes are compressed with the client's
+# preferred Accept-Encoding: brotli when the optional `brotli` package is
+# installed, else gzip. Streamed responses are compressed chunk by chunk with
+# a flush after each chunk, so rows still reach the client as they are read.
+# Registered after the metrics hook so the size it records is the size sent,
+# and before the unit-of-work hook so the commit happens first.
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+COMPRESS_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/plain', 'text/csv', 'text/html'}
+
+
+# gzip container (wbits 31); compress() returns output flushed up to the chunk's end
+class GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+COMPRESS_ENCODERS = {'gzip': GzipEncoder}
+if brotli is not None:
+    COMPRESS_ENCODERS = {'br': BrotliEncoder, 'gzip': GzipEncoder}
+
+
+def compress_stream(chunks, encoder, route, encoding):
+    uncompressed = compressed = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            uncompressed += len(chunk)
+            data = encoder.compress(chunk)
+            compressed += len(data)
+            yield data
+        data = encoder.finish()
+        compressed += len(data)
+        yield data
+    finally:
+        if uncompressed:
+            request_metrics.observe_compression(route, encoding, uncompressed, compressed)
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+@app.after_request
+def compress_response(response):
+    if (request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+
+    # Whether or not this one is compressed, the body depends on Accept-Encoding
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(list(COMPRESS_ENCODERS))
+    if encoding is None:
+        return response
+
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    encoder = COMPRESS_ENCODERS[encoding]()
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoder, route, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        compressed = encoder.compress(data) + encoder.finish()
+        response.set_data(compressed)
+        request_metrics.observe_compression(route, encoding, len(data), len(compressed))
+
+    response.headers['Content-Encoding'] = encoding
+    # A strong ETag names exact bytes, which now depend on the encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+#####################################################################################################
+# Request-scoped connection / unit of work
+
+# The connection shared by the route and every helper it calls during one
+# request. close() is a no-op: the connection goes back to the pool at
+# teardown, after the request's transaction has been finished once.
+class RequestConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    # explain-check drives the write routes without keeping their writes
+    def commit(self):
+        if app.config.get('DB_ROLLBACK_ONLY'):
+            return self._conn.rollback()
+        return self._conn.commit()
+
+    def close(self):
+        pass
+
+
 def get_db_connection():
-    # Database connection details
-    db_host = os.getenv('HOST')
-    db_username = os.getenv('USERNAME')
-    db_password = os.getenv('PASSWORD')
-    db = 'ourvle'
-
-    return mysql.connector.connect(
-        host=db_host, 
-        user=db_username, 
-        password=db_password, 
-        database=db
-    )
+    # Outside a request (scripts, shell) the caller owns the checkout
+    if not has_app_context():
+        return get_pool().acquire()
+
+    if 'db' not in g:
+        started = time.perf_counter()
+        g.db = get_pool().acquire()
+        request_metrics.observe_acquire(time.perf_counter() - started)
+    return RequestConnection(g.db)
+
+
+# Commit the request's transaction once, at the end. Error responses roll
+# back whatever the route wrote before bailing out.
+@app.after_request
+def finish_db_transaction(response):
+    conn = g.get('db')
+    if conn is None or not conn.in_transaction:
+        return response
+
+    try:
+        if response.status_code < 400 and not app.config.get('DB_ROLLBACK_ONLY'):
+            conn.commit()
+        else:
+            conn.rollback()
+    except Exception as e:
+        print(e)
+        return jsonify(message="Failed to commit transaction"), 500
+
+    return response
+
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    conn = g.pop('db', None)
+    if conn is not None:
+        # Pool release rolls back anything left uncommitted
+        conn.close()
+
+
+#####################################################################################################
+# Data access
+
+# Every fixed statement the routes run, by name. They execute as server-side
+# prepared statements cached on each pooled connection, so the server parses
+# each one once per connection instead of once per request. Statements whose
+# text depends on the request (IN lists, optional filters) are built in the
+# route and go through conn.cursor(prepared=True), which caches them by text.
+STATEMENTS = {
+    # Users and accounts
+    'user_identity': """
+        SELECT User.UserId, User.Username, User.Name, Account.AccType
+        FROM User
+        JOIN Account ON User.UserId = Account.UserId
+        WHERE User.UserId = %s
+    """,
+    'account_type': "SELECT AccType FROM Account WHERE UserId = %s",
+    'user_count': """
+        SELECT COUNT(*) AS Total
+        FROM User
+        JOIN Account ON User.UserId = Account.UserId
+    """,
+    'user_count_by_type': """
+        SELECT COUNT(*) AS Total
+        FROM User
+        JOIN Account ON User.UserId = Account.UserId
+        WHERE Account.AccType = %s
+    """,
+    'user_exists': "SELECT UserId FROM User WHERE UserId = %s",
+    'insert_user': "INSERT INTO User (UserId, Username, Password, Name) VALUES (%s, %s, %s, %s)",
+    'insert_account': "INSERT INTO Account (UserId, AccType) VALUES (%s, %s)",
+    'user_login': """
+        SELECT User.UserId, User.Username, User.Name, Account.AccType
+        FROM User
+        JOIN Account ON User.UserId = Account.UserId
+        WHERE User.UserId = %s AND User.Password = %s
+    """,
+
+    # Courses and memberships
+    'course_exists': "SELECT CourseId FROM Course WHERE CourseId = %s",
+    'insert_course': "INSERT INTO Course (CourseId, CourseName, Period) VALUES (%s, %s, %s)",
+    'all_courses': "SELECT * FROM Course",
+    'course_by_id': """
+        SELECT CourseId, CourseName, Period
+        FROM Course
+        WHERE CourseId = %s
+    """,
+    # The caller has already checked the user's account type
+    'courses_of_user': """
+        SELECT Course.CourseId, Course.CourseName, Course.Period
+        FROM Membership
+        INNER JOIN Course ON Membership.CourseId = Course.CourseId
+        WHERE Membership.UserId = %s
+    """,
+    'course_maintainer': """
+        SELECT Membership.UserId FROM Membership
+        JOIN Account ON Membership.UserId = Account.UserId
+        WHERE Membership.CourseId = %s AND Account.AccType = 'Course Maintainer'
+        LIMIT 1
+    """,
+    'insert_membership': "INSERT INTO Membership (UserId, CourseId) VALUES (%s, %s)",
+    'course_members': """
+        SELECT User.UserId, User.Username, User.Name, Account.AccType
+        FROM Membership
+        INNER JOIN User ON Membership.UserId = User.UserId
+        INNER JOIN Account ON User.UserId = Account.UserId
+        WHERE Membership.CourseId = %s
+    """,
+    'course_member': """
+        SELECT Membership.MemberId, Membership.UserId, Membership.CourseId,
+               User.Username, User.Name
+        FROM Membership
+        JOIN User ON Membership.UserId = User.UserId
+        WHERE Membership.MemberId = %s
+    """,
+
+    # Calendar
+    'course_events': """
+        SELECT EventId, CourseId, StartDate, EndDate, EventTitle, Description
+        FROM CalendarEvent
+        WHERE CourseId = %s
+        ORDER BY StartDate
+    """,
+    'event_by_id': """
+        SELECT EventId, CourseId, StartDate, EndDate, EventTitle, Description
+        FROM CalendarEvent
+        WHERE EventId = %s
+    """,
+    'insert_event': """
+        INSERT INTO CalendarEvent (CourseId, StartDate, EndDate, EventTitle, Description)
+        VALUES (%s, %s, %s, %s, %s)
+    """,
+    # Events of every course a user is a member of that overlap [start, end],
+    # once each even with a duplicated membership (hence IN, not a join).
+    # Plain column comparisons so (CourseId, StartDate, EventId, EndDate) can serve the range
+    'user_events_between': """
+        SELECT CalendarEvent.EventId, CalendarEvent.CourseId, CalendarEvent.StartDate, CalendarEvent.EndDate,
+               CalendarEvent.EventTitle, CalendarEvent.Description
+        FROM CalendarEvent
+        WHERE CalendarEvent.CourseId IN (SELECT CourseId FROM Membership WHERE UserId = %s)
+          AND CalendarEvent.StartDate <= %s AND CalendarEvent.EndDate >= %s
+        ORDER BY CalendarEvent.StartDate, CalendarEvent.EventId
+    """,
+
+    # Forums and threads
+    'insert_forum': """
+        INSERT INTO DiscussionForum (ForumTitle, CourseId)
+        VALUES (%s, %s)
+    """,
+    'course_forums': """
+        SELECT ForumId, ForumTitle, CourseId
+        FROM DiscussionForum
+        WHERE CourseId = %s
+    """,
+    'forum_by_id': """
+        SELECT ForumId, ForumTitle, CourseId
+        FROM DiscussionForum
+        WHERE ForumId = %s
+    """,
+    'forum_member': """
+        SELECT Membership.UserId FROM Membership
+        JOIN DiscussionForum ON Membership.CourseId = DiscussionForum.CourseId
+        WHERE DiscussionForum.ForumId = %s AND Membership.UserId = %s
+    """,
+    'insert_thread': """
+        INSERT INTO DiscussionThread (ForumId, ThreadTitle, ThreadContent, UserId, ParentThreadId)
+        VALUES (%s, %s, %s, %s, %s)
+    """,
+    'forum_threads': """
+        SELECT ThreadId, ThreadTitle, ThreadContent, UserId, ParentThreadId
+        FROM DiscussionThread
+        WHERE ForumId = %s
+        ORDER BY ThreadId ASC
+    """,
+    'thread_replies': """
+        SELECT ThreadId, ThreadTitle, ThreadContent, UserId, ParentThreadId
+        FROM DiscussionThread
+        WHERE ParentThreadId = %s
+        ORDER BY ThreadId ASC
+    """,
+    'forum_exists': "SELECT ForumId FROM DiscussionForum WHERE ForumId = %s",
+    'forum_root_threads_page': """
+        SELECT ThreadId
+        FROM DiscussionThread
+        WHERE ForumId = %s AND ParentThreadId IS NULL AND ThreadId > %s
+        ORDER BY ThreadId ASC
+        LIMIT %s
+    """,
+
+    # Course content
+    'section_exists': "SELECT SectionId, CourseId FROM Section WHERE SectionId = %s",
+    'insert_section': """
+        INSERT INTO Section (SectionTitle, CourseId)
+        VALUES (%s, %s)
+    """,
+    'course_sections': """
+        SELECT SectionId, SectionTitle, CourseId
+        FROM Section
+        WHERE CourseId = %s
+        ORDER BY SectionId ASC
+    """,
+    'insert_section_item': """
+        INSERT INTO SectionItem (SectionContent, SectionId)
+        VALUES (%s, %s)
+    """,
+    'section_items': """
+        SELECT ItemId, SectionContent, SectionId
+        FROM SectionItem
+        WHERE SectionId = %s
+        ORDER BY ItemId ASC
+    """,
+    'insert_topic': """
+        INSERT INTO Topic (TopicTitle, SectionId)
+        VALUES (%s, %s)
+    """,
+    'section_topics': """
+        SELECT TopicId, TopicTitle, SectionId
+        FROM Topic
+        WHERE SectionId = %s
+        ORDER BY TopicId ASC
+    """,
+
+    # Assignments
+    'insert_assignment': """
+        INSERT INTO Assignment (AssignmentTitle, CourseId, DueDate)
+        VALUES (%s, %s, %s)
+    """,
+    'course_assignments': """
+        SELECT AssignmentId, AssignmentTitle, CourseId, DueDate
+        FROM Assignment
+        WHERE CourseId = %s
+        ORDER BY DueDate ASC
+    """,
+    'assignment_by_id': """
+        SELECT AssignmentId, AssignmentTitle, CourseId, DueDate
+        FROM Assignment
+        WHERE AssignmentId = %s
+    """,
+    'assignment_exists': "SELECT AssignmentId, CourseId FROM Assignment WHERE AssignmentId = %s",
+    'insert_submission': """
+        INSERT INTO AssignmentSubmission (AssignmentId, UserId, SubmissionDate, Grade)
+        VALUES (%s, %s, %s, NULL)
+    """,
+    'assignment_submissions': """
+        SELECT AssignmentSubmission.SubmissionId, AssignmentSubmission.AssignmentId, 
+               AssignmentSubmission.UserId, AssignmentSubmission.SubmissionDate, 
+               AssignmentSubmission.Grade, User.Username, User.Name
+        FROM AssignmentSubmission
+        JOIN User ON AssignmentSubmission.UserId = User.UserId
+        WHERE AssignmentSubmission.AssignmentId = %s
+        ORDER BY AssignmentSubmission.SubmissionDate ASC
+    """,
+    'submission_by_id': """
+        SELECT AssignmentSubmission.SubmissionId, AssignmentSubmission.AssignmentId, 
+               AssignmentSubmission.UserId, AssignmentSubmission.SubmissionDate, 
+               AssignmentSubmission.Grade, User.Username, User.Name, 
+               Assignment.AssignmentTitle, Assignment.DueDate
+        FROM AssignmentSubmission
+        JOIN User ON AssignmentSubmission.UserId = User.UserId
+        JOIN Assignment ON AssignmentSubmission.AssignmentId = Assignment.AssignmentId
+        WHERE AssignmentSubmission.SubmissionId = %s
+    """,
+    'user_submission': """
+        SELECT AssignmentSubmission.SubmissionId, AssignmentSubmission.AssignmentId, 
+               AssignmentSubmission.UserId, AssignmentSubmission.SubmissionDate, 
+               AssignmentSubmission.Grade, User.Username, User.Name
+        FROM AssignmentSubmission
+        JOIN User ON AssignmentSubmission.UserId = User.UserId
+        WHERE AssignmentSubmission.AssignmentId = %s AND AssignmentSubmission.UserId = %s
+    """,
+    'student_exists': "SELECT UserId FROM Account WHERE UserId = %s AND AccType = 'Student'",
+    # Without a lock: the grade aggregates of these keys are locked before the submission
+    'submission_keys': """
+        SELECT AssignmentSubmission.UserId, Assignment.CourseId
+        FROM AssignmentSubmission
+        JOIN Assignment ON AssignmentSubmission.AssignmentId = Assignment.AssignmentId
+        WHERE AssignmentSubmission.SubmissionId = %s
+    """,
+    # Locks only the submission; grades of other submissions of the assignment can change meanwhile
+    'lock_submission': """
+        SELECT AssignmentSubmission.SubmissionId, AssignmentSubmission.UserId, AssignmentSubmission.Grade, Assignment.CourseId
+        FROM AssignmentSubmission
+        JOIN Assignment ON AssignmentSubmission.AssignmentId = Assignment.AssignmentId
+        WHERE AssignmentSubmission.SubmissionId = %s
+        FOR UPDATE OF AssignmentSubmission
+    """,
+    'update_grade': """
+        UPDATE AssignmentSubmission
+        SET Grade = %s
+        WHERE SubmissionId = %s
+    """,
+
+    # Reports
+    'report_refreshed_at': "SELECT RefreshedAt FROM ReportRefresh WHERE ReportName = %s",
+    'course_grade_stats': """
+        SELECT CourseId, SubmissionCount, GradeCount, AverageGrade, MinGrade, MaxGrade
+        FROM ReportCourseGrades
+        WHERE CourseId = %s
+    """,
+    'student_grade_stats': """
+        SELECT UserId, SubmissionCount, GradeCount, AverageGrade, MinGrade, MaxGrade
+        FROM ReportStudentGrades
+        WHERE UserId = %s
+    """,
+    'courses_many_students': """
+        SELECT CourseId, CourseName, EnrollmentCount AS StudentCount
+        FROM ReportCourseEnrollment
+        WHERE EnrollmentCount >= 50
+    """,
+    'students_many_courses': """
+        SELECT UserId, Username, Name, CourseCount
+        FROM ReportUserCourseCount
+        WHERE AccType = 'Student' AND CourseCount >= 5
+    """,
+    'maintainers_many_courses': """
+        SELECT UserId, Username, Name, CourseCount
+        FROM ReportUserCourseCount
+        WHERE AccType = 'Course Maintainer' AND CourseCount >= 3
+    """,
+    'top_enrolled_courses': """
+        SELECT CourseId, CourseName, EnrollmentCount
+        FROM ReportCourseEnrollment
+        ORDER BY EnrollmentCount DESC
+        LIMIT 10
+    """,
+    'top_students_by_average': """
+        SELECT User.UserId, User.Username, User.Name, Top.AverageGrade
+        FROM (
+            SELECT UserId, AverageGrade
+            FROM ReportStudentGrades
+            WHERE GradeCount > 0
+            ORDER BY AverageGrade DESC
+            LIMIT 10
+        ) AS Top
+        JOIN User ON Top.UserId = User.UserId
+        ORDER BY Top.AverageGrade DESC
+    """,
+
+    # Resource versions (conditional GET)
+    'resource_versions': "SELECT ResourceName, Version, UpdatedAt FROM ResourceVersion WHERE ResourceName IN (%s, '*')",
+    'bump_resource_version': """
+        INSERT INTO ResourceVersion (ResourceName, Version, UpdatedAt)
+        VALUES (%s, 1, UTC_TIMESTAMP())
+        ON DUPLICATE KEY UPDATE Version = Version + 1, UpdatedAt = UTC_TIMESTAMP()
+    """,
+
+    # Gradebook
+    'gradebook_assignments': """
+        SELECT AssignmentId, AssignmentTitle, DueDate
+        FROM Assignment
+        WHERE CourseId = %s
+        ORDER BY DueDate, AssignmentId
+    """,
+    # One row per student and submitted assignment (a single row of NULLs for
+    # students without submissions), grouped by student. Membership is only
+    # tested with EXISTS, as nothing stops a student being enrolled twice.
+    'gradebook_grades': """
+        SELECT User.UserId, User.Username, User.Name, Latest.AssignmentId, Submission.Grade
+        FROM User
+        JOIN Account ON User.UserId = Account.UserId AND Account.AccType = 'Student'
+        LEFT JOIN (
+            SELECT UserId, AssignmentId, MAX(SubmissionId) AS SubmissionId
+            FROM AssignmentSubmission
+            WHERE AssignmentId IN (SELECT AssignmentId FROM Assignment WHERE CourseId = %s)
+            GROUP BY UserId, AssignmentId
+        ) AS Latest ON Latest.UserId = User.UserId
+        LEFT JOIN AssignmentSubmission AS Submission ON Submission.SubmissionId = Latest.SubmissionId
+        WHERE EXISTS (SELECT 1 FROM Membership WHERE Membership.UserId = User.UserId AND Membership.CourseId = %s)
+        ORDER BY User.UserId
+    """,
+}
+
+
+# The request's connection, for the named statement helpers below. Outside an
+# app context nothing would commit or release a checkout they made, so
+# scripts execute STATEMENTS[name] on a cursor of their own connection instead.
+def statement_connection():
+    if not has_app_context():
+        raise RuntimeError("Named statement helpers need an app context; execute STATEMENTS[name] on your own cursor")
+    return get_db_connection()
+
+
+# Rows of a named statement as dicts, on the request's connection
+def fetch_all(name, params=()):
+    cursor = statement_connection().cursor(dictionary=True, prepared=True)
+    cursor.execute(STATEMENTS[name], params)
+    return cursor.fetchall()
+
+
+# First row of a named statement, or None
+def fetch_one(name, params=()):
+    rows = fetch_all(name, params)
+    return rows[0] if rows else None
+
+
+# Rows of a named statement as tuples, with their column names
+def fetch_rows(name, params=()):
+    cursor = statement_connection().cursor(prepared=True)
+    cursor.execute(STATEMENTS[name], params)
+    return cursor.column_names, cursor.fetchall()
+
+
+# Run a named write statement; the cursor carries rowcount and lastrowid
+def run_statement(name, params=()):
+    cursor = statement_connection().cursor(prepared=True)
+    cursor.execute(STATEMENTS[name], params)
+    return cursor
+
 
 # User class
 class User(UserMixin):
@@ -42,54 +1321,399 @@ class User(UserMixin):
         self.accType = accType
 
 
+#####################################################################################################
+# Identity cache
+
+# Bounded LRU of user id -> (username, name, accType) with a TTL, so that
+# rebuilding current_user does not cost any queries in the steady state.
+class IdentityCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, username, name, accType):
+        key = str(user_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), (username, name, accType))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+identity_cache = IdentityCache(
+    maxsize=int(os.getenv('IDENTITY_CACHE_SIZE', 10000)),
+    ttl=float(os.getenv('IDENTITY_CACHE_TTL', 300))
+)
+
+
 # User Loader
 @login_manager.user_loader
 def load_user(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute('SELECT * FROM User WHERE UserId = %s', (user_id,))
-    user_record = cursor.fetchone()
+    identity = identity_cache.get(user_id)
+    if identity:
+        username, name, accType = identity
+        return User(id=int(user_id), username=username, name=name, accType=accType)
+
+    user_record = fetch_one('user_identity', (user_id,))
     if user_record:
-        cursor.execute("SELECT * FROM account WHERE UserId = %s", (user_id,))
-        account_record = cursor.fetchone()
-        conn.close()
-        return User(id=user_record['UserId'], username=user_record['Username'], name=user_record['Name'], accType=account_record['AccType'])
-    conn.close()
+        identity_cache.put(user_record['UserId'], user_record['Username'], user_record['Name'], user_record['AccType'])
+        return User(id=user_record['UserId'], username=user_record['Username'], name=user_record['Name'], accType=user_record['AccType'])
     return None
 
 
 def getAccountType(user_id):
+    identity = identity_cache.get(user_id)
+    if identity:
+        return identity[2]
+
+    return fetch_one('account_type', (user_id,))['AccType']
+
+
+# "%s, %s, ..." for an IN (...) list of the given values
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+MAX_BATCH_COURSES = 50
+
+# Bulk endpoints: most items per request, and rows per statement
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 10000))
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+# User imports are streamed, so they allow more rows
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', 100000))
+
+# Longest window the calendar range view will group per day
+CALENDAR_MAX_RANGE_DAYS = 62
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Page size from ?limit=, clamped to [1, max_size]
+def get_page_size(default=DEFAULT_PAGE_SIZE, max_size=MAX_PAGE_SIZE):
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, max_size))
+
+
+# Keyset pagination cursors are the sort key of the last row of a page,
+# handed to the client as an opaque string
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+# Boolean query parameter (?flag=true / 1 / yes)
+def get_bool_arg(name, default=False):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+# Optional YYYY-MM-DD query parameter; raises ValueError if malformed
+def parse_date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+# Id from a JSON body or CSV upload: an int (not a bool), or a string of
+# digits; raises ValueError for anything else, eg. 3.7 or true
+def parse_id(value):
+    if isinstance(value, str) and value.strip().isascii() and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    raise ValueError(f"Invalid id: {value!r}")
+
+
+# Rows of an uploaded CSV (multipart field "file", or a text/csv request body),
+# read incrementally from the request stream. Column names are lower-cased.
+def iter_csv_upload():
+    stream = request.files['file'].stream if 'file' in request.files else request.stream
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield {(name or '').strip().lower(): (value or '').strip() for name, value in row.items()}
+
+
+STREAM_FETCH_SIZE = int(os.getenv('STREAM_FETCH_SIZE', 500))
+
+# Streaming mode requested by the client: ?stream=json, ?stream=ndjson or an
+# Accept: application/x-ndjson header. None means a regular response.
+def get_stream_format():
+    fmt = request.args.get('stream')
+    if fmt is None and request.accept_mimetypes.best == 'application/x-ndjson':
+        fmt = 'ndjson'
+    if fmt in ('1', 'true'):
+        fmt = 'json'
+    return fmt if fmt in ('json', 'ndjson') else None
+
+
+# Stream the rows of a query from an unbuffered cursor, STREAM_FETCH_SIZE rows
+# at a time, so memory per request stays flat however large the result is.
+# JSON output is an array, or the envelope dict with the array under `key`;
+# NDJSON output is one row per line.
+def stream_query(query, params, fmt, key=None, envelope=None):
+    # The body is produced after the unit of work has finished, so the stream
+    # takes over the request's connection and hands it back once the
+    # response is closed. The generator keeps the request context, so its
+    # statement counts towards the request's metrics and slow-query route.
+    conn = g.pop('db', None) or get_pool().acquire()
+    dumps = app.json.dumps
+
+    if key is None:
+        head, tail = '[', ']'
+    else:
+        fields = ''.join(f'{dumps(name)}: {dumps(value)}, ' for name, value in (envelope or {}).items())
+        head, tail = '{' + fields + dumps(key) + ': [', ']}'
+
+    def generate():
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        try:
+            cursor.execute(query, params)
+
+            if fmt == 'ndjson':
+                while True:
+                    rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+                    if not rows:
+                        break
+                    yield ''.join(dumps(row) + '\n' for row in rows)
+                return
+
+            yield head
+            separator = ''
+            while True:
+                rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+                if not rows:
+                    break
+                yield separator + ', '.join(dumps(row) for row in rows)
+                separator = ', '
+            yield tail
+        finally:
+            # With unread rows left (client went away) the pool discards the connection on release
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.call_on_close(conn.close)
+    return response
+
+
+# Conditional GET
+#
+# Course page reads only change through a few create routes, which bump the
+# read's version (eg. "members:1001") in the same transaction as their write.
+# A versioned route answers a matching If-None-Match / If-Modified-Since with
+# 304 Not Modified from that one lookup, before any of its own queries run.
+# The "*" version covers every resource; bump it with
+# `flask --app app invalidate-etags` after changing data outside the API.
+
+def bump_resource_version(resource, key):
+    run_statement('bump_resource_version', (f"{resource}:{key}",))
+
+
+# "<* version>.<own version>" plus the time of the latest bump (None if never bumped)
+def get_resource_version(name):
+    versions = {'*': 0, name: 0}
+    last_modified = None
+    for row in fetch_all('resource_versions', (name,)):
+        versions[row['ResourceName']] = row['Version']
+        updated_at = row['UpdatedAt'].replace(tzinfo=timezone.utc)
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+    return f"{versions['*']}.{versions[name]}", last_modified
+
+
+def is_not_modified(etag, last_modified):
+    # If-None-Match wins over If-Modified-Since when both are sent
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+# Wraps a GET route whose data is versioned by `resource`, keyed by the URL
+# argument `key_arg`. Only 200 responses are tagged; the query string is part
+# of the ETag since it changes the representation (eg. ?stream=ndjson).
+def versioned(resource, key_arg):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            name = f"{resource}:{kwargs[key_arg]}"
+            try:
+                version, last_modified = get_resource_version(name)
+            except Exception as e:
+                print(e)
+                return jsonify({"message": "Failed to read resource version"}), 500
+
+            etag = f"{name}-{version}-{zlib.crc32(request.query_string):08x}"
+            if is_not_modified(etag, last_modified):
+                response = app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            # Let clients keep the response but revalidate it on every use
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+@app.cli.command('invalidate-etags')
+def invalidate_etags_command():
+    """Change the ETag of every versioned resource."""
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT AccType FROM Account WHERE UserId = %s", (user_id,))
-    acc_type = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return acc_type['AccType']
+    run_statement('bump_resource_version', ('*',))
+    conn.commit()
+    print("Resource versions bumped")
 
 #####################################################################################################
 #####################################################################################################
 #####################################################################################################
 
+ACCOUNT_TYPES = ['Admin', 'Course Maintainer', 'Student']
+# User.UserId is an INT, and Username, Password and Name are VARCHAR(255)
+USER_ID_MAX = 2147483647
+USER_FIELD_MAX_LENGTH = 255
+
+# User counts are a full index scan at generator scale, so they are computed
+# apart from the page query and kept for a while
+USER_COUNT_TTL = float(os.getenv('USER_COUNT_TTL', 60))
+_user_counts = {}
+_user_counts_lock = threading.Lock()
+
+def get_user_count(acc_type=None):
+    with _user_counts_lock:
+        cached = _user_counts.get(acc_type)
+    if cached and time.monotonic() - cached[1] < USER_COUNT_TTL:
+        return cached[0]
+
+    if acc_type:
+        total = fetch_one('user_count_by_type', (acc_type,))['Total']
+    else:
+        total = fetch_one('user_count')['Total']
+
+    with _user_counts_lock:
+        _user_counts[acc_type] = (total, time.monotonic())
+    return total
+
+def invalidate_user_counts():
+    with _user_counts_lock:
+        _user_counts.clear()
+
+
+# Get users one page at a time, ordered by UserId
+# url eg: /users?limit=100&accType=Student&includeTotal=true&after=<nextCursor>
+# Add ?stream=json or ?stream=ndjson to export every matching user in one streamed response
 @app.route('/users', methods=['GET'])
 def get_all_users():
+    acc_type = request.args.get('accType')
+    if acc_type and acc_type not in ACCOUNT_TYPES:
+        return jsonify({"error": "Invalid account type. Must be one of 'Admin', 'Course Maintainer', 'Student'"}), 400
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Execute the query to fetch all users with their account type
-        cursor.execute("""
+        after = decode_cursor(request.args['after']) if 'after' in request.args else None
+        if after is not None and len(after) != 1:
+            raise ValueError("after cursor must hold (UserId)")
+    except ValueError:
+        return jsonify({"error": "Invalid after cursor"}), 400
+
+    limit = get_page_size()
+    stream_format = get_stream_format()
+
+    try:
+        # Execute the query to fetch a page of users with their account type
+        query = """
             SELECT User.UserId, User.Username, User.Name, Account.AccType
             FROM User
             JOIN Account ON User.UserId = Account.UserId
-        """)
-        
+            WHERE User.UserId > %s
+        """
+        params = [after[0] if after else -1]
+        if acc_type:
+            query += " AND Account.AccType = %s"
+            params.append(acc_type)
+        query += " ORDER BY User.UserId"
+
+        if stream_format:
+            return stream_query(query, tuple(params), stream_format, key='users')
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True, prepared=True)
+
+        query += " LIMIT %s"
+        params.append(limit + 1)
+
+        cursor.execute(query, tuple(params))
         users = cursor.fetchall()
+
+        result = {"users": users[:limit], "nextCursor": None}
+        if len(users) > limit:
+            result['nextCursor'] = encode_cursor(users[limit - 1]['UserId'])
+
+        if get_bool_arg('includeTotal'):
+            result['total'] = get_user_count(acc_type)
         
         cursor.close()
         conn.close()
         
-        return jsonify(users), 200
+        return jsonify(result), 200
     except Exception as e:
         print(e)  # It's good practice to log the error for debugging purposes
         return jsonify({"error": "Failed to retrieve users"}), 500
@@ -98,21 +1722,8 @@ def get_all_users():
 @app.route('/user/<user_id>', methods=['GET'])
 def get_user_by_id(user_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch the user by userId, including their account type
-        cursor.execute("""
-            SELECT User.UserId, User.Username, User.Name, Account.AccType
-            FROM User
-            JOIN Account ON User.UserId = Account.UserId
-            WHERE User.UserId = %s
-        """, (user_id,))
-        
-        user = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        user = fetch_one('user_identity', (user_id,))
         
         if user:
             return jsonify(user), 200
@@ -139,25 +1750,17 @@ def register_user():
         if not userId or not username or not name or not password or not accType:
             return jsonify({"message":"Invalid request. Please provide all required fields (UserId, Username, Name, Password, AccType)"}), 400
         
-        if accType not in ['Admin', 'Course Maintainer', 'Student']:
+        if accType not in ACCOUNT_TYPES:
             return jsonify({"message":"Invalid account type. Must be one of 'Admin', 'Course Maintainer', 'Student'"}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         # Check if user already exists
-        cursor.execute("SELECT * FROM user WHERE UserId = %s", (userId,))
-
-        if cursor.fetchone():
+        if fetch_one('user_exists', (userId,)):
             return jsonify({"message":"User already exists"}), 400
         
-        cursor.execute("INSERT INTO user (UserId, Username, Password, Name) VALUES (%s, %s, %s, %s)", (userId, username, password, name))
-        conn.commit()
-        cursor.execute("INSERT INTO account (UserId, AccType) VALUES (%s, %s)", (userId, accType))
-        conn.commit()
-
-        cursor.close()
-        conn.close()
+        run_statement('insert_user', (userId, username, password, name))
+        run_statement('insert_account', (userId, accType))
+        identity_cache.invalidate(userId)
+        invalidate_user_counts()
 
         return jsonify({"message":"User registered successfully"}), 201
     
@@ -166,6 +1769,126 @@ def register_user():
         return jsonify({"message":"An unexpected error occurred"}), 500
 
 
+# Import users in bulk: a JSON array of {"userId", "username", "name", "password", "accType"}
+# objects, or a CSV upload (text/csv body or multipart "file") with those columns.
+# Rows are written in chunks of BULK_CHUNK_SIZE, each committed on its own, so a
+# bad chunk only loses its own rows. Returns an error for every row not imported.
+@app.route('/register/bulk', methods=['POST'])
+def register_users_bulk():
+    if request.is_json:
+        rows = request.get_json()
+        if not isinstance(rows, list):
+            return jsonify({"message": "Please provide a list of users"}), 400
+        if len(rows) > IMPORT_MAX_ROWS:
+            return jsonify({"message": f"At most {IMPORT_MAX_ROWS} users can be imported at once"}), 400
+        rows = ({str(name).lower(): value for name, value in row.items()} if isinstance(row, dict) else {} for row in rows)
+    else:
+        rows = iter_csv_upload()
+
+    imported = 0
+    errors = []
+    seen = set()
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(prepared=True)
+
+        chunk = []
+        for row_number, row in enumerate(rows, start=1):
+            if row_number > IMPORT_MAX_ROWS:
+                errors.append({"row": row_number, "message": f"Import stopped after {IMPORT_MAX_ROWS} rows"})
+                break
+            chunk.append((row_number, row))
+            if len(chunk) == BULK_CHUNK_SIZE:
+                imported += import_user_chunk(conn, cursor, chunk, seen, errors)
+                chunk = []
+        if chunk:
+            imported += import_user_chunk(conn, cursor, chunk, seen, errors)
+
+        cursor.close()
+        conn.close()
+    except (UnicodeDecodeError, csv.Error) as e:
+        errors.append({"message": f"Could not read the CSV upload: {e}"})
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "An unexpected error occurred", "imported": imported, "errors": errors}), 500
+    finally:
+        if imported:
+            invalidate_user_counts()
+
+    return jsonify({"imported": imported, "failed": len(errors), "errors": errors}), 201 if imported else 400
+
+
+# Validate, deduplicate and insert one chunk of import rows in its own transaction
+def import_user_chunk(conn, cursor, chunk, seen, errors):
+    valid = []
+    for row_number, row in chunk:
+        userId = row.get('userid')
+        username = row.get('username')
+        name = row.get('name')
+        password = row.get('password')
+        accType = row.get('acctype')
+
+        if not userId or not username or not name or not password or not accType:
+            errors.append({"row": row_number, "userId": userId, "message": "Missing required fields (UserId, Username, Name, Password, AccType)"})
+            continue
+        try:
+            userId = parse_id(userId)
+        except ValueError:
+            errors.append({"row": row_number, "userId": userId, "message": "Invalid user ID"})
+            continue
+        if not 0 < userId <= USER_ID_MAX:
+            errors.append({"row": row_number, "userId": userId, "message": "Invalid user ID"})
+            continue
+        # Checked per row, so one bad value cannot fail the whole chunk's insert
+        if not all(isinstance(value, str) and len(value) <= USER_FIELD_MAX_LENGTH for value in (username, name, password)):
+            errors.append({"row": row_number, "userId": userId, "message": f"Username, Name and Password must be text of at most {USER_FIELD_MAX_LENGTH} characters"})
+            continue
+        if accType not in ACCOUNT_TYPES:
+            errors.append({"row": row_number, "userId": userId, "message": "Invalid account type. Must be one of 'Admin', 'Course Maintainer', 'Student'"})
+            continue
+        if userId in seen:
+            errors.append({"row": row_number, "userId": userId, "message": "Duplicate user ID in import"})
+            continue
+        seen.add(userId)
+        valid.append((row_number, userId, username, name, password, accType))
+
+    if not valid:
+        return 0
+
+    # Check which users already exist in one query
+    ids = [row[1] for row in valid]
+    cursor.execute(f"SELECT UserId FROM User WHERE UserId IN ({placeholders(ids)})", tuple(ids))
+    existing = {row[0] for row in cursor.fetchall()}
+
+    new_rows = []
+    for row in valid:
+        if row[1] in existing:
+            errors.append({"row": row[0], "userId": row[1], "message": "User already exists"})
+        else:
+            new_rows.append(row)
+
+    if not new_rows:
+        conn.rollback()
+        return 0
+
+    try:
+        # executemany turns each of these into one multi-row INSERT
+        cursor.executemany("INSERT INTO User (UserId, Username, Password, Name) VALUES (%s, %s, %s, %s)",
+                           [(userId, username, password, name) for _, userId, username, name, password, _ in new_rows])
+        cursor.executemany("INSERT INTO Account (UserId, AccType) VALUES (%s, %s)",
+                           [(userId, accType) for _, userId, _, _, _, accType in new_rows])
+        conn.commit()
+    except mysql.connector.Error as e:
+        print(e)
+        conn.rollback()
+        errors.extend({"row": row[0], "userId": row[1], "message": "Failed to import this row's chunk"} for row in new_rows)
+        return 0
+
+    for row in new_rows:
+        identity_cache.invalidate(row[1])
+    return len(new_rows)
+
+
 # Login a user
 @app.route('/login', methods=['POST'])
 def login():
@@ -178,18 +1901,12 @@ def login():
         if not userId or not password:
             return jsonify({"message":"Please provide both userId and password"}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("SELECT * FROM user WHERE UserId = %s AND Password = %s", (userId, password))
-        user_record = cursor.fetchone()
+        user_record = fetch_one('user_login', (userId, password))
 
         if user_record:
-            cursor.execute("SELECT * FROM account WHERE UserId = %s", (userId,))
-            account_record = cursor.fetchone()
-
-            user = User(id=user_record['UserId'], username=user_record['Username'], name=user_record['Name'], accType=account_record['AccType'])
+            user = User(id=user_record['UserId'], username=user_record['Username'], name=user_record['Name'], accType=user_record['AccType'])
             login_user(user)
+            identity_cache.put(user.id, user.username, user.name, user.accType)
 
             return jsonify({
                 "message": "Login successful", 
@@ -245,19 +1962,10 @@ def create_course():
         if not courseId or not courseName or not period:
             return jsonify({"message":"Please provide all required fields. (courseId, courseName, period)"}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("SELECT * FROM course WHERE CourseId = %s", (courseId,))
-
-        if cursor.fetchone():
+        if fetch_one('course_exists', (courseId,)):
             return jsonify({"message":"Course ID already exists"}), 400
 
-        cursor.execute("INSERT INTO course (CourseId, CourseName, Period) VALUES (%s, %s, %s)", (courseId, courseName, period))
-
-        conn.commit()
-        cursor.close()
-        conn.close()
+        run_statement('insert_course', (courseId, courseName, period))
 
         return jsonify(message="Course created successfully"), 201
     except Exception as e:
@@ -269,14 +1977,7 @@ def create_course():
 @app.route('/course', methods=['GET'])
 def get_courses():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute('SELECT * FROM Course')
-        courses = cursor.fetchall()
-
-        cursor.close()
-        conn.close()
+        courses = fetch_all('all_courses')
 
         return jsonify(courses), 200
     except Exception as e:
@@ -284,22 +1985,11 @@ def get_courses():
         return jsonify({"message":"Failed to get all courses"}), 500
 
 @app.route('/course/<course_id>', methods=['GET'])
+@versioned('course', 'course_id')
 def get_course_by_id(course_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch the course by courseId
-        cursor.execute("""
-            SELECT CourseId, CourseName, Period
-            FROM Course
-            WHERE CourseId = %s
-        """, (course_id,))
-        
-        course = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        course = fetch_one('course_by_id', (course_id,))
         
         if course:
             return jsonify(course), 200
@@ -313,28 +2003,12 @@ def get_course_by_id(course_id):
 @app.route('/course/student/<student_id>', methods=['GET'])
 def get_student_courses(student_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
         accType = getAccountType(student_id)
 
         if accType != 'Student':
             return jsonify({"message": "User not a Student."}), 401
         
-        query = """
-        SELECT Course.CourseId, Course.CourseName, Course.Period
-        FROM User
-        INNER JOIN Account ON User.UserId = Account.UserId
-        INNER JOIN Membership ON Account.UserId = Membership.UserId
-        INNER JOIN Course ON Membership.CourseId = Course.CourseId
-        WHERE User.UserId = %s AND Account.AccType = 'Student'
-        """
-        
-        cursor.execute(query, (student_id,))
-        courses = cursor.fetchall()
-
-        cursor.close()
-        conn.close()
+        courses = fetch_all('courses_of_user', (student_id,))
         
         return jsonify(courses), 200
     except Exception as e:
@@ -346,28 +2020,12 @@ def get_student_courses(student_id):
 @app.route('/course/maintainer/<maintainer_id>', methods=['GET'])
 def get_maintainer_courses(maintainer_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
         accType = getAccountType(maintainer_id)
 
         if accType != 'Course Maintainer':
             return jsonify({"message": "User not a Course Maintainer."}), 401
         
-        query = """
-        SELECT Course.CourseId, Course.CourseName, Course.Period
-        FROM User
-        INNER JOIN Account ON User.UserId = Account.UserId
-        INNER JOIN Membership ON Account.UserId = Membership.UserId
-        INNER JOIN Course ON Membership.CourseId = Course.CourseId
-        WHERE User.UserId = %s AND Account.AccType = 'Course Maintainer'
-        """
-        
-        cursor.execute(query, (maintainer_id,))
-        courses = cursor.fetchall()
-
-        cursor.close()
-        conn.close()
+        courses = fetch_all('courses_of_user', (maintainer_id,))
         
         return jsonify(courses), 200
     except Exception as e:
@@ -386,7 +2044,7 @@ def register_course():
             return jsonify({"message": "Please provide a course ID"}), 400
 
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor(dictionary=True, prepared=True)
 
         accType = getAccountType(user_id)
 
@@ -394,52 +2052,135 @@ def register_course():
             return jsonify({"message": "Admins cannot register for courses"}), 403
         
         if accType == 'Course Maintainer':
-            cursor.execute("""
-                SELECT Membership.* FROM Membership
-                JOIN Account ON Membership.UserId = Account.UserId
-                WHERE Membership.CourseId = %s AND Account.AccType = 'Course Maintainer'
-            """, (course_id,))
-            if cursor.fetchone():
+            if fetch_one('course_maintainer', (course_id,)):
                 return jsonify({"message": "A Course Maintainer is already assigned to this course"}), 400
         
-        cursor.execute('INSERT INTO Membership (UserId, CourseId) VALUES (%s, %s)', (user_id, course_id))
-        conn.commit()
+        run_statement('insert_membership', (user_id, course_id))
+        record_enrollments(cursor, course_id, [user_id])
+        bump_resource_version('members', course_id)
             
         return jsonify(message="Registered for course successfully"), 201
     except Exception as e:
         print(e)
         return jsonify(message="Failed to register for course"), 500
     
-# Get all members for a course
+# Register many users for a course in one transaction
+# body eg: {"courseId": 1001, "userIds": [1, 2, 3]}
+# or a CSV upload (text/csv body or multipart "file") with a userId column: /course/register/bulk?courseId=1001
+@app.route('/course/register/bulk', methods=['POST'])
+def register_course_bulk():
+    try:
+        if request.is_json:
+            data = request.json
+            course_id = data.get('courseId')
+            user_ids = data.get('userIds')
+        else:
+            course_id = request.args.get('courseId') or request.form.get('courseId')
+            user_ids = [row.get('userid') for row in iter_csv_upload()]
+    except (UnicodeDecodeError, csv.Error):
+        return jsonify({"message": "Could not read the CSV upload"}), 400
+
+    if not course_id or not isinstance(user_ids, list) or not user_ids:
+        return jsonify({"message": "Please provide a course ID and a list of user IDs"}), 400
+
+    if len(user_ids) > BULK_MAX_ITEMS:
+        return jsonify({"message": f"At most {BULK_MAX_ITEMS} users can be registered at once"}), 400
+
+    # Per-user results, in request order
+    results = []
+    candidates = {}
+    for user_id in user_ids:
+        result = {"userId": user_id, "status": "error"}
+        results.append(result)
+        try:
+            user_id = parse_id(user_id)
+        except ValueError:
+            result['message'] = "Invalid user ID"
+            continue
+        result['userId'] = user_id
+        if user_id in candidates:
+            result['message'] = "Duplicate user ID"
+            continue
+        candidates[user_id] = result
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True, prepared=True)
+
+        # Check if the course exists, and whether it already has a Course Maintainer
+        if fetch_one('course_exists', (course_id,)) is None:
+            return jsonify({"message": "Course not found"}), 404
+
+        has_maintainer = fetch_one('course_maintainer', (course_id,)) is not None
+
+        # Account types and existing memberships, one query per chunk each
+        account_types = {}
+        registered = set()
+        candidate_ids = list(candidates)
+        for start in range(0, len(candidate_ids), BULK_CHUNK_SIZE):
+            chunk = candidate_ids[start:start + BULK_CHUNK_SIZE]
+            cursor.execute(f"SELECT UserId, AccType FROM Account WHERE UserId IN ({placeholders(chunk)})", tuple(chunk))
+            for row in cursor.fetchall():
+                account_types[row['UserId']] = row['AccType']
+            cursor.execute(f"""
+                SELECT UserId FROM Membership
+                WHERE CourseId = %s AND UserId IN ({placeholders(chunk)})
+            """, (course_id, *chunk))
+            registered.update(row['UserId'] for row in cursor.fetchall())
+
+        accepted = []
+        for user_id, result in candidates.items():
+            acc_type = account_types.get(user_id)
+            if acc_type is None:
+                result['message'] = "User not found"
+            elif acc_type == 'Admin':
+                result['message'] = "Admins cannot register for courses"
+            elif user_id in registered:
+                result['message'] = "Already registered for this course"
+            elif acc_type == 'Course Maintainer' and has_maintainer:
+                result['message'] = "A Course Maintainer is already assigned to this course"
+            else:
+                if acc_type == 'Course Maintainer':
+                    has_maintainer = True
+                accepted.append(user_id)
+                result['status'] = "registered"
+                result.pop('message', None)
+
+        if not accepted:
+            return jsonify({"courseId": course_id, "registered": 0, "results": results}), 400
+
+        # executemany turns each chunk into one multi-row INSERT
+        for start in range(0, len(accepted), BULK_CHUNK_SIZE):
+            chunk = accepted[start:start + BULK_CHUNK_SIZE]
+            cursor.executemany("INSERT INTO Membership (UserId, CourseId) VALUES (%s, %s)", [(user_id, course_id) for user_id in chunk])
+            record_enrollments(cursor, course_id, chunk)
+        bump_resource_version('members', course_id)
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({"courseId": course_id, "registered": len(accepted), "results": results}), 201
+    except Exception as e:
+        print(e)
+        return jsonify(message="Failed to register users for course"), 500
+
+
+# Get all members for a course (?stream=json|ndjson to stream them)
 @app.route('/members/<course_id>', methods=['GET'])
+@versioned('members', 'course_id')
 def get_course_members(course_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the course exists
-        cursor.execute("SELECT * FROM Course WHERE CourseId = %s", (course_id,))
-        course = cursor.fetchone()
-        
-        if not course:
+        if not fetch_one('course_exists', (course_id,)):
             return jsonify({"message": "Course not found"}), 404
+
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_query(STATEMENTS['course_members'], (course_id,), stream_format, key='members', envelope={"courseId": course_id})
         
-        query = """
-        SELECT User.UserId, User.Username, User.Name, Account.AccType
-        FROM Membership
-        INNER JOIN User ON Membership.UserId = User.UserId
-        INNER JOIN Account ON User.UserId = Account.UserId
-        WHERE Membership.CourseId = %s
-        """
-        
-        cursor.execute(query, (course_id,))
-        members = cursor.fetchall()
+        members = fetch_all('course_members', (course_id,))
         
-        cursor.close()
-        conn.close()
-        
-        if members:
-            return jsonify({"courseId": course_id, "members": members}), 200
+        return jsonify({"courseId": course_id, "members": members}), 200
     except Exception as e:
         print(e)
         return jsonify({"message": "Failed to retrieve course members"}), 500
@@ -448,22 +2189,8 @@ def get_course_members(course_id):
 @app.route('/course_member/<member_id>', methods=['GET'])
 def get_course_member_by_id(member_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch the course member by memberId, including the member's user data
-        cursor.execute("""
-            SELECT Membership.MemberId, Membership.UserId, Membership.CourseId, 
-                   User.Username, User.Name
-            FROM Membership
-            JOIN User ON Membership.UserId = User.UserId
-            WHERE Membership.MemberId = %s
-        """, (member_id,))
-        
-        member = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        member = fetch_one('course_member', (member_id,))
         
         if member:
             return jsonify(member), 200
@@ -476,29 +2203,15 @@ def get_course_member_by_id(member_id):
 
 # Get all calendar events for a course
 @app.route('/calendar/course/<course_id>', methods=['GET'])
+@versioned('calendar', 'course_id')
 def calendar_events(course_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
         # Check if the course exists
-        cursor.execute("SELECT CourseId FROM Course WHERE CourseId = %s", (course_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('course_exists', (course_id,)) is None:
             return jsonify({"message": "Course not found"}), 404
         
         # Fetch all calendar events for the course
-        query = """
-            SELECT EventId, CourseId, StartDate, EndDate, EventTitle, Description
-            FROM CalendarEvent
-            WHERE CourseId = %s
-            ORDER BY StartDate
-        """
-        cursor.execute(query, (course_id,))
-        
-        events = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        events = fetch_all('course_events', (course_id,))
         
         return jsonify({"courseId": course_id, "calendarEvents": events}), 200
     except Exception as e:
@@ -510,20 +2223,8 @@ def calendar_events(course_id):
 @app.route('/calendar/<event_id>', methods=['GET'])
 def get_calendar_event_by_id(event_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch the calendar event by eventId
-        cursor.execute("""
-            SELECT EventId, CourseId, StartDate, EndDate, EventTitle, Description
-            FROM CalendarEvent
-            WHERE EventId = %s
-        """, (event_id,))
-        
-        event = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        event = fetch_one('event_by_id', (event_id,))
         
         if event:
             return jsonify(event), 200
@@ -549,26 +2250,12 @@ def create_calendar_event():
         if not all([course_id, start_date, end_date, event_title, description]):
             return jsonify({"message": "Missing required fields (courseId, startDate, endDate, eventTitle, description)"}), 400
     
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
         # Check if the course exists
-        cursor.execute("SELECT * FROM Course WHERE CourseId = %s", (course_id,))
-        course = cursor.fetchone()
-
-        if not course:
+        if not fetch_one('course_exists', (course_id,)):
             return jsonify({"message": "Course not found"}), 404
         
-        query = """
-            INSERT INTO CalendarEvent (CourseId, StartDate, EndDate, EventTitle, Description)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-
-        cursor.execute(query, (course_id, start_date, end_date, event_title, description))
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
+        run_statement('insert_event', (course_id, start_date, end_date, event_title, description))
+        bump_resource_version('calendar', course_id)
         
         return jsonify({"message": "Calendar event created successfully"}), 201
     except Exception as e:
@@ -589,9 +2276,6 @@ def get_daily_calendar_events(user_id):
         return jsonify({"message": "Invalid date format. Please use YYYY-MM-DD."}), 400
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Verify the user is a student
         acc_type = getAccountType(user_id)
 
@@ -599,60 +2283,131 @@ def get_daily_calendar_events(user_id):
             return jsonify({"message": "User must be a Student or Course Maintainer"}), 404
         
         # Find courses the student is a member of and fetch calendar events for those courses on the specified date
-        query = """
-        SELECT CalendarEvent.EventId, CalendarEvent.CourseId, CalendarEvent.StartDate, CalendarEvent.EndDate, 
-               CalendarEvent.EventTitle, CalendarEvent.Description
-        FROM Membership
-        INNER JOIN CalendarEvent ON Membership.CourseId = CalendarEvent.CourseId
-        WHERE Membership.UserId = %s AND DATE(CalendarEvent.StartDate) <= %s AND DATE(CalendarEvent.EndDate) >= %s
-        ORDER BY CalendarEvent.StartDate
-        """
-        
-        cursor.execute(query, (user_id, event_date, event_date))
-        events = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        events = fetch_all('user_events_between', (user_id, event_date, event_date))
         
         return jsonify({"userId": user_id, "date": str(event_date), "calendarEvents": events}), 200
     except Exception as e:
         print(e)
         return jsonify({"message": "Failed to retrieve calendar events for the user on the specified date"}), 500
 
+# Get a user's calendar events for a week or month, grouped per day
+# url eg: /calendar/user/range/123?view=week&date=2024-04-18 (the week holding that date, from Monday)
+#         /calendar/user/range/123?view=month&date=2024-04-18
+#         /calendar/user/range/123?from=2024-04-15&to=2024-04-28
+@app.route('/calendar/user/range/<user_id>', methods=['GET'])
+def get_calendar_range_events(user_id):
+    view = request.args.get('view')
+    try:
+        if view in ('week', 'month'):
+            day = parse_date_arg('date') or datetime.now().date()
+            if view == 'week':
+                start = day - timedelta(days=day.weekday())
+                end = start + timedelta(days=6)
+            else:
+                start = day.replace(day=1)
+                end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        elif view is None:
+            start = parse_date_arg('from')
+            end = parse_date_arg('to')
+            if not start or not end:
+                raise ValueError("from and to are required without a view")
+        else:
+            return jsonify({"message": "Invalid view. Must be one of 'week', 'month'"}), 400
+    except ValueError:
+        return jsonify({"message": "Invalid date format. Please use YYYY-MM-DD."}), 400
+
+    if end < start or (end - start).days >= CALENDAR_MAX_RANGE_DAYS:
+        return jsonify({"message": f"The range must run forward and cover at most {CALENDAR_MAX_RANGE_DAYS} days"}), 400
+
+    try:
+        acc_type = getAccountType(user_id)
+        if acc_type == 'Admin':
+            return jsonify({"message": "User must be a Student or Course Maintainer"}), 404
+
+        # One query for the whole range, then spread each event over the days it covers
+        events = fetch_all('user_events_between', (user_id, end, start))
+
+        days = [{"date": (start + timedelta(days=offset)).isoformat(), "calendarEvents": []}
+                for offset in range((end - start).days + 1)]
+        for event in events:
+            first = max(event['StartDate'], start)
+            last = min(event['EndDate'], end)
+            for offset in range((first - start).days, (last - start).days + 1):
+                days[offset]['calendarEvents'].append(event)
+
+        return jsonify({"userId": user_id, "from": start.isoformat(), "to": end.isoformat(), "days": days}), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Failed to retrieve calendar events for the user in the specified range"}), 500
+
 # Get all calendar events for a user
+# url eg: /calendar/user/123?from=2024-04-01&to=2024-04-30&limit=50&after=<nextCursor>
 @app.route('/calendar/user/<user_id>', methods=['GET'])
 def user_calendar_events(user_id):
+    # Optional date window and keyset pagination
+    try:
+        date_from = parse_date_arg('from')
+        date_to = parse_date_arg('to')
+        after = decode_cursor(request.args['after']) if 'after' in request.args else None
+        if after is not None and len(after) != 2:
+            raise ValueError("after cursor must hold (StartDate, EventId)")
+    except ValueError:
+        return jsonify({"message": "Invalid from/to date (use YYYY-MM-DD) or after cursor."}), 400
+
+    paginate = 'limit' in request.args or after is not None
+    limit = get_page_size()
+
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor(dictionary=True, prepared=True)
         
         # Verify the user is a user
         acc_type = getAccountType(user_id)
         if acc_type == 'Admin':
             return jsonify({"message": "User must be a Student or Course Maintainer"}), 404
         
-        # Find courses the user is a member of
-        cursor.execute("""
-            SELECT CourseId FROM Membership
-            WHERE UserId = %s
-        """, (user_id,))
-        courses = cursor.fetchall()
-        
-        # Fetch calendar events for those courses
-        events = []
-        for course in courses:
-            cursor.execute("""
-                SELECT EventId, CourseId, StartDate, EndDate, EventTitle, Description
-                FROM CalendarEvent
-                WHERE CourseId = %s
-                ORDER BY StartDate
-            """, (course['CourseId'],))
-            events.extend(cursor.fetchall())
+        # Fetch the events of every course the user is a member of in one query
+        query = """
+            SELECT EventId, CourseId, StartDate, EndDate, EventTitle, Description
+            FROM CalendarEvent
+            WHERE CourseId IN (SELECT CourseId FROM Membership WHERE UserId = %s)
+        """
+        params = [user_id]
+
+        # An event is in the window if it overlaps it at all
+        if date_from:
+            query += " AND EndDate >= %s"
+            params.append(date_from)
+        if date_to:
+            query += " AND StartDate <= %s"
+            params.append(date_to)
+        # Events without a StartDate sort last, and a cursor into them holds None
+        if after and after[0] is None:
+            query += " AND StartDate IS NULL AND EventId > %s"
+            params.append(after[1])
+        elif after:
+            query += " AND (StartDate > %s OR (StartDate = %s AND EventId > %s) OR StartDate IS NULL)"
+            params.extend([after[0], after[0], after[1]])
+
+        query += " ORDER BY StartDate IS NULL, StartDate, EventId"
+        if paginate:
+            # One extra row tells us whether there is a next page
+            query += " LIMIT %s"
+            params.append(limit + 1)
+
+        cursor.execute(query, tuple(params))
+        events = cursor.fetchall()
         
         cursor.close()
         conn.close()
+
+        next_cursor = None
+        if paginate and len(events) > limit:
+            events = events[:limit]
+            last = events[-1]
+            next_cursor = encode_cursor(last['StartDate'] and last['StartDate'].isoformat(), last['EventId'])
         
-        return jsonify({"userId": user_id, "calendarEvents": events}), 200
+        return jsonify({"userId": user_id, "calendarEvents": events, "nextCursor": next_cursor}), 200
     except Exception as e:
         print(e)
         return jsonify({"message": "Failed to retrieve calendar events for the user"}), 500
@@ -669,26 +2424,13 @@ def create_discussion_forum():
         return jsonify({"message": "Missing required fields (courseId, forumTitle)"}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the course exists
-        cursor.execute("SELECT CourseId FROM Course WHERE CourseId = %s", (course_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('course_exists', (course_id,)) is None:
             return jsonify({"message": "Course not found"}), 404
         
-        # Insert discussion forum
-        cursor.execute("""
-            INSERT INTO DiscussionForum (ForumTitle, CourseId)
-            VALUES (%s, %s)
-        """, (forum_title, course_id))
-        conn.commit()
-        
-        # Retrieve the last inserted forum id
-        forum_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
+        # Insert discussion forum, keeping its new id
+        forum_id = run_statement('insert_forum', (forum_title, course_id)).lastrowid
+        bump_resource_version('forums', course_id)
         
         return jsonify({"message": "Discussion forum created successfully", "forumId": forum_id}), 201
     
@@ -699,27 +2441,15 @@ def create_discussion_forum():
 
 # Get all discussion forums for a course
 @app.route('/forum/<course_id>', methods=['GET'])
+@versioned('forums', 'course_id')
 def get_discussion_forums(course_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the course exists
-        cursor.execute("SELECT CourseId FROM Course WHERE CourseId = %s", (course_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('course_exists', (course_id,)) is None:
             return jsonify({"message": "Course not found"}), 404
         
         # Fetch all discussion forums for the course
-        cursor.execute("""
-            SELECT ForumId, ForumTitle, CourseId
-            FROM DiscussionForum
-            WHERE CourseId = %s
-        """, (course_id,))
-        
-        forums = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        forums = fetch_all('course_forums', (course_id,))
         
         return jsonify({"courseId": course_id, "discussionForums": forums}), 200
     except Exception as e:
@@ -730,20 +2460,8 @@ def get_discussion_forums(course_id):
 @app.route('/get-forum/<forum_id>', methods=['GET'])
 def get_forum_by_id(forum_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch the forum by forumId
-        cursor.execute("""
-            SELECT ForumId, ForumTitle, CourseId
-            FROM DiscussionForum
-            WHERE ForumId = %s
-        """, (forum_id,))
-        
-        forum = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        forum = fetch_one('forum_by_id', (forum_id,))
         
         if forum:
             return jsonify(forum), 200
@@ -768,30 +2486,12 @@ def create_thread():
         return jsonify({"message": "Missing required fields"}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the user is a member of the course associated with the forum
-        cursor.execute("""
-            SELECT Membership.UserId FROM Membership
-            JOIN DiscussionForum ON Membership.CourseId = DiscussionForum.CourseId
-            WHERE DiscussionForum.ForumId = %s AND Membership.UserId = %s
-        """, (forum_id, user_id))
-        
-        if cursor.fetchone() is None:
+        if fetch_one('forum_member', (forum_id, user_id)) is None:
             return jsonify({"message": "User is not a member of the course associated with this forum"}), 403
         
         # Insert the discussion thread or reply
-        cursor.execute("""
-            INSERT INTO DiscussionThread (ForumId, ThreadTitle, ThreadContent, UserId, ParentThreadId)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (forum_id, thread_title, thread_content, user_id, parent_thread_id))
-        conn.commit()
-        
-        thread_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
+        thread_id = run_statement('insert_thread', (forum_id, thread_title, thread_content, user_id, parent_thread_id)).lastrowid
         
         return jsonify({"message": "Discussion thread added successfully", "threadId": thread_id}), 201
     
@@ -800,25 +2500,16 @@ def create_thread():
         return jsonify({"message": "Failed to add discussion thread"}), 500
     
 
-# Get all (top-level) threads for a discussion forum
+# Get all (top-level) threads for a discussion forum (?stream=json|ndjson to stream them)
 @app.route('/forum_threads/<forum_id>', methods=['GET'])
 def get_forum_threads(forum_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch all threads for the forum
-        cursor.execute("""
-            SELECT ThreadId, ThreadTitle, ThreadContent, UserId, ParentThreadId
-            FROM DiscussionThread
-            WHERE ForumId = %s
-            ORDER BY ThreadId ASC
-        """, (forum_id,))
-        
-        threads = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_query(STATEMENTS['forum_threads'], (forum_id,), stream_format, key='threads', envelope={"forumId": forum_id})
+
+        threads = fetch_all('forum_threads', (forum_id,))
         
         return jsonify({"forumId": forum_id, "threads": threads}), 200
     except Exception as e:
@@ -830,21 +2521,8 @@ def get_forum_threads(forum_id):
 @app.route('/thread_replies/<thread_id>', methods=['GET'])
 def get_thread_replies(thread_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch all replies for the thread
-        cursor.execute("""
-            SELECT ThreadId, ThreadTitle, ThreadContent, UserId, ParentThreadId
-            FROM DiscussionThread
-            WHERE ParentThreadId = %s
-            ORDER BY ThreadId ASC
-        """, (thread_id,))
-        
-        replies = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        replies = fetch_all('thread_replies', (thread_id,))
         
         return jsonify({"ThreadId": thread_id, "replies": replies}), 200
     except Exception as e:
@@ -852,6 +2530,124 @@ def get_thread_replies(thread_id):
         return jsonify({"message": "Failed to retrieve thread replies"}), 500    
 
 
+DEFAULT_THREAD_TREE_DEPTH = 10
+MAX_THREAD_TREE_DEPTH = 50
+DEFAULT_THREAD_PAGE_SIZE = 20
+
+# Load the reply trees under root_ids, at most max_depth levels below each root,
+# with one recursive query. Every node carries its direct ReplyCount, so nodes
+# cut off by the depth limit still show that they have replies.
+def load_thread_trees(cursor, root_ids, max_depth):
+    if not root_ids:
+        return []
+
+    cursor.execute(f"""
+        WITH RECURSIVE Tree AS (
+            SELECT ThreadId, ThreadTitle, ThreadContent, UserId, ParentThreadId, 0 AS Depth
+            FROM DiscussionThread
+            WHERE ThreadId IN ({placeholders(root_ids)})
+            UNION ALL
+            SELECT Reply.ThreadId, Reply.ThreadTitle, Reply.ThreadContent, Reply.UserId, Reply.ParentThreadId, Tree.Depth + 1
+            FROM DiscussionThread AS Reply
+            JOIN Tree ON Reply.ParentThreadId = Tree.ThreadId
+            WHERE Tree.Depth < %s
+        )
+        SELECT Tree.ThreadId, Tree.ThreadTitle, Tree.ThreadContent, Tree.UserId, Tree.ParentThreadId, Tree.Depth,
+               (SELECT COUNT(*) FROM DiscussionThread AS Reply WHERE Reply.ParentThreadId = Tree.ThreadId) AS ReplyCount
+        FROM Tree
+        ORDER BY Tree.Depth, Tree.ThreadId
+    """, (*root_ids, max_depth))
+
+    # Parents come before their replies, so each node can be attached as it is read
+    nodes = {}
+    for row in cursor.fetchall():
+        node = {
+            "ThreadId": row['ThreadId'],
+            "ThreadTitle": row['ThreadTitle'],
+            "ThreadContent": row['ThreadContent'],
+            "UserId": row['UserId'],
+            "ParentThreadId": row['ParentThreadId'],
+            "ReplyCount": row['ReplyCount'],
+            "Replies": []
+        }
+        nodes[row['ThreadId']] = node
+        if row['Depth'] > 0:
+            nodes[row['ParentThreadId']]['Replies'].append(node)
+
+    return [nodes[root_id] for root_id in root_ids if root_id in nodes]
+
+
+def get_max_depth_arg():
+    max_depth = request.args.get('maxDepth', DEFAULT_THREAD_TREE_DEPTH, type=int)
+    return max(0, min(max_depth, MAX_THREAD_TREE_DEPTH))
+
+
+# Get a page of a forum's top-level threads with their whole reply trees
+# url eg: /forum_tree/12?limit=20&maxDepth=10&after=<nextCursor>
+@app.route('/forum_tree/<int:forum_id>', methods=['GET'])
+def get_forum_tree(forum_id):
+    try:
+        after = decode_cursor(request.args['after']) if 'after' in request.args else None
+        if after is not None and len(after) != 1:
+            raise ValueError("after cursor must hold (ThreadId)")
+    except ValueError:
+        return jsonify({"message": "Invalid after cursor"}), 400
+
+    limit = get_page_size(default=DEFAULT_THREAD_PAGE_SIZE)
+    max_depth = get_max_depth_arg()
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True, prepared=True)
+
+        # Check if the forum exists
+        if fetch_one('forum_exists', (forum_id,)) is None:
+            return jsonify({"message": "Forum not found"}), 404
+
+        # Page of top-level threads
+        rows = fetch_all('forum_root_threads_page', (forum_id, after[0] if after else -1, limit + 1))
+        root_ids = [row['ThreadId'] for row in rows]
+
+        next_cursor = None
+        if len(root_ids) > limit:
+            root_ids = root_ids[:limit]
+            next_cursor = encode_cursor(root_ids[-1])
+
+        threads = load_thread_trees(cursor, root_ids, max_depth)
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({"forumId": forum_id, "threads": threads, "nextCursor": next_cursor}), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Failed to retrieve forum thread tree"}), 500
+
+
+# Get a thread with its whole reply tree
+# url eg: /thread_tree/345?maxDepth=10
+@app.route('/thread_tree/<int:thread_id>', methods=['GET'])
+def get_thread_tree(thread_id):
+    max_depth = get_max_depth_arg()
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True, prepared=True)
+
+        threads = load_thread_trees(cursor, [thread_id], max_depth)
+
+        cursor.close()
+        conn.close()
+
+        if not threads:
+            return jsonify({"message": "Thread not found"}), 404
+
+        return jsonify(threads[0]), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Failed to retrieve thread tree"}), 500
+
+
 # Create a new section
 @app.route('/create_section', methods=['POST'])
 def create_section():
@@ -865,9 +2661,6 @@ def create_section():
         return jsonify({"message": "Missing required fields"}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the user is a Course Maintainer
         acc_type = getAccountType(user_id)
         print(acc_type)
@@ -875,21 +2668,12 @@ def create_section():
             return jsonify({"message": "Only Course Maintainers can add sections"}), 401
         
         # Check if the course exists
-        cursor.execute("SELECT CourseId FROM Course WHERE CourseId = %s", (course_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('course_exists', (course_id,)) is None:
             return jsonify({"message": "Course not found"}), 404
         
         # Insert the section
-        cursor.execute("""
-            INSERT INTO Section (SectionTitle, CourseId)
-            VALUES (%s, %s)
-        """, (section_title, course_id))
-        conn.commit()
-        
-        section_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
+        section_id = run_statement('insert_section', (section_title, course_id)).lastrowid
+        bump_resource_version('content', course_id)
         
         return jsonify({"message": "Section created successfully", "sectionId": section_id}), 201
     
@@ -900,28 +2684,15 @@ def create_section():
 
 # Get all sections for a course
 @app.route('/section/<course_id>', methods=['GET'])
+@versioned('content', 'course_id')
 def get_course_sections(course_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the course exists
-        cursor.execute("SELECT CourseId FROM Course WHERE CourseId = %s", (course_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('course_exists', (course_id,)) is None:
             return jsonify({"message": "Course not found"}), 404
         
         # Fetch all sections for the course
-        cursor.execute("""
-            SELECT SectionId, SectionTitle, CourseId
-            FROM Section
-            WHERE CourseId = %s
-            ORDER BY SectionId ASC
-        """, (course_id,))
-        
-        sections = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        sections = fetch_all('course_sections', (course_id,))
         
         return jsonify({"courseId": course_id, "sections": sections}), 200
     except Exception as e:
@@ -941,25 +2712,14 @@ def create_section_item():
         return jsonify({"message": "Missing required fields"}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Verify the section exists
-        cursor.execute("SELECT SectionId FROM Section WHERE SectionId = %s", (section_id,))
-        if cursor.fetchone() is None:
+        section = fetch_one('section_exists', (section_id,))
+        if section is None:
             return jsonify({"message": "Section not found"}), 404
         
         # Insert the section item
-        cursor.execute("""
-            INSERT INTO SectionItem (SectionContent, SectionId)
-            VALUES (%s, %s)
-        """, (section_content, section_id))
-        conn.commit()
-        
-        item_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
+        item_id = run_statement('insert_section_item', (section_content, section_id)).lastrowid
+        bump_resource_version('content', section['CourseId'])
         
         return jsonify({"message": "Section item created successfully", "itemId": item_id}), 201
     
@@ -972,26 +2732,12 @@ def create_section_item():
 @app.route('/section_items/<section_id>', methods=['GET'])
 def get_section_items(section_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the section exists
-        cursor.execute("SELECT SectionId FROM Section WHERE SectionId = %s", (section_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('section_exists', (section_id,)) is None:
             return jsonify({"message": "Section not found"}), 404
         
         # Fetch all items for the section
-        cursor.execute("""
-            SELECT ItemId, SectionContent, SectionId
-            FROM SectionItem
-            WHERE SectionId = %s
-            ORDER BY ItemId ASC
-        """, (section_id,))
-        
-        items = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        items = fetch_all('section_items', (section_id,))
         
         return jsonify({"sectionId": section_id, "sectionItems": items}), 200
     except Exception as e:
@@ -1011,25 +2757,14 @@ def create_topic():
         return jsonify({"message": "Missing required fields (sectionId, topicTitle)"}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Verify the section exists
-        cursor.execute("SELECT SectionId FROM Section WHERE SectionId = %s", (section_id,))
-        if cursor.fetchone() is None:
+        section = fetch_one('section_exists', (section_id,))
+        if section is None:
             return jsonify({"message": "Section not found"}), 404
         
         # Insert the topic
-        cursor.execute("""
-            INSERT INTO Topic (TopicTitle, SectionId)
-            VALUES (%s, %s)
-        """, (topic_title, section_id))
-        conn.commit()
-        
-        topic_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
+        topic_id = run_statement('insert_topic', (topic_title, section_id)).lastrowid
+        bump_resource_version('content', section['CourseId'])
         
         return jsonify({"message": "Topic created successfully", "topicId": topic_id}), 201
     
@@ -1042,26 +2777,12 @@ def create_topic():
 @app.route('/topic/<section_id>', methods=['GET'])
 def get_section_topics(section_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the section exists
-        cursor.execute("SELECT SectionId FROM Section WHERE SectionId = %s", (section_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('section_exists', (section_id,)) is None:
             return jsonify({"message": "Section not found"}), 404
         
         # Fetch all topics for the section
-        cursor.execute("""
-            SELECT TopicId, TopicTitle, SectionId
-            FROM Topic
-            WHERE SectionId = %s
-            ORDER BY TopicId ASC
-        """, (section_id,))
-        
-        topics = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        topics = fetch_all('section_topics', (section_id,))
         
         return jsonify({"sectionId": section_id, "topics": topics}), 200
     except Exception as e:
@@ -1069,45 +2790,98 @@ def get_section_topics(section_id):
         return jsonify({"message": "Failed to retrieve section topics"}), 500
 
 
+# Load the sections of several courses, with their items and topics, in three
+# queries no matter how many sections there are. Returns {CourseId: [section, ...]}.
+def load_course_content(cursor, course_ids):
+    content = {course_id: [] for course_id in course_ids}
+    if not course_ids:
+        return content
+
+    params = tuple(course_ids)
+
+    cursor.execute(f"""
+        SELECT SectionId, SectionTitle, CourseId
+        FROM Section
+        WHERE CourseId IN ({placeholders(params)})
+        ORDER BY SectionId ASC
+    """, params)
+    sections = {}
+    for row in cursor.fetchall():
+        section = {"SectionId": row['SectionId'], "SectionTitle": row['SectionTitle'], "SectionItems": [], "Topics": []}
+        sections[row['SectionId']] = section
+        content[row['CourseId']].append(section)
+
+    if not sections:
+        return content
+
+    cursor.execute(f"""
+        SELECT SectionItem.ItemId, SectionItem.SectionContent, SectionItem.SectionId
+        FROM SectionItem
+        JOIN Section ON SectionItem.SectionId = Section.SectionId
+        WHERE Section.CourseId IN ({placeholders(params)})
+        ORDER BY SectionItem.ItemId ASC
+    """, params)
+    for row in cursor.fetchall():
+        sections[row['SectionId']]['SectionItems'].append({"ItemId": row['ItemId'], "SectionContent": row['SectionContent']})
+
+    cursor.execute(f"""
+        SELECT Topic.TopicId, Topic.TopicTitle, Topic.SectionId
+        FROM Topic
+        JOIN Section ON Topic.SectionId = Section.SectionId
+        WHERE Section.CourseId IN ({placeholders(params)})
+        ORDER BY Topic.TopicId ASC
+    """, params)
+    for row in cursor.fetchall():
+        sections[row['SectionId']]['Topics'].append({"TopicId": row['TopicId'], "TopicTitle": row['TopicTitle']})
+
+    return content
+
+
 # Get all course content
-@app.route('/course/content/<course_id>', methods=['GET'])
+@app.route('/course/content/<int:course_id>', methods=['GET'])
+@versioned('content', 'course_id')
 def get_course_content(course_id):
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor(dictionary=True, prepared=True)
         
-        # Fetch sections for the course
-        cursor.execute("""
-            SELECT SectionId, SectionTitle
-            FROM Section
-            WHERE CourseId = %s
-        """, (course_id,))
-        sections = cursor.fetchall()
-
-        # For each section, fetch related section items and topics
-        for section in sections:
-            # Fetch section items
-            cursor.execute("""
-                SELECT ItemId, SectionContent
-                FROM SectionItem
-                WHERE SectionId = %s
-            """, (section['SectionId'],))
-            section_items = cursor.fetchall()
-            section['SectionItems'] = section_items
-            
-            # Fetch topics
-            cursor.execute("""
-                SELECT TopicId, TopicTitle
-                FROM Topic
-                WHERE SectionId = %s
-            """, (section['SectionId'],))
-            topics = cursor.fetchall()
-            section['Topics'] = topics
+        content = load_course_content(cursor, [course_id])
         
         cursor.close()
         conn.close()
         
-        return jsonify({"courseId": course_id, "sections": sections}), 200
+        return jsonify({"courseId": str(course_id), "sections": content[course_id]}), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Failed to retrieve course content"}), 500
+
+
+# Get content for several courses at once
+# url eg: /course/content?courseIds=1001,1002,1003
+@app.route('/course/content', methods=['GET'])
+def get_many_courses_content():
+    try:
+        course_ids = [int(course_id) for course_id in request.args.get('courseIds', '').split(',') if course_id.strip()]
+    except ValueError:
+        return jsonify({"message": "courseIds must be a comma separated list of course IDs"}), 400
+
+    if not course_ids:
+        return jsonify({"message": "Please provide courseIds"}), 400
+
+    if len(course_ids) > MAX_BATCH_COURSES:
+        return jsonify({"message": f"At most {MAX_BATCH_COURSES} courses can be loaded at once"}), 400
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True, prepared=True)
+
+        content = load_course_content(cursor, list(dict.fromkeys(course_ids)))
+
+        cursor.close()
+        conn.close()
+
+        courses = [{"courseId": str(course_id), "sections": sections} for course_id, sections in content.items()]
+        return jsonify({"courses": courses}), 200
     except Exception as e:
         print(e)
         return jsonify({"message": "Failed to retrieve course content"}), 500
@@ -1132,25 +2906,13 @@ def create_assignment():
         return jsonify({"message": "Invalid dueDate format. Use YYYY-MM-DD."}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the course exists
-        cursor.execute("SELECT CourseId FROM Course WHERE CourseId = %s", (course_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('course_exists', (course_id,)) is None:
             return jsonify({"message": "Course not found"}), 404
         
         # Insert the assignment
-        cursor.execute("""
-            INSERT INTO Assignment (AssignmentTitle, CourseId, DueDate)
-            VALUES (%s, %s, %s)
-        """, (assignment_title, course_id, due_date))
-        conn.commit()
-        
-        assignment_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
+        assignment_id = run_statement('insert_assignment', (assignment_title, course_id, due_date)).lastrowid
+        bump_resource_version('assignments', course_id)
         
         return jsonify({"message": "Assignment created successfully", "assignmentId": assignment_id}), 201
     
@@ -1161,28 +2923,15 @@ def create_assignment():
 
 # Get all assignments for a course
 @app.route('/assignment/course/<course_id>', methods=['GET'])
+@versioned('assignments', 'course_id')
 def get_course_assignments(course_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Check if the course exists
-        cursor.execute("SELECT CourseId FROM Course WHERE CourseId = %s", (course_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('course_exists', (course_id,)) is None:
             return jsonify({"message": "Course not found"}), 404
         
         # Fetch all assignments for the course
-        cursor.execute("""
-            SELECT AssignmentId, AssignmentTitle, CourseId, DueDate
-            FROM Assignment
-            WHERE CourseId = %s
-            ORDER BY DueDate ASC
-        """, (course_id,))
-        
-        assignments = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        assignments = fetch_all('course_assignments', (course_id,))
         
         return jsonify({"courseId": course_id, "assignments": assignments}), 200
     except Exception as e:
@@ -1194,20 +2943,8 @@ def get_course_assignments(course_id):
 @app.route('/assignment/<assignment_id>', methods=['GET'])
 def get_assignment_by_id(assignment_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch the assignment by assignmentId
-        cursor.execute("""
-            SELECT AssignmentId, AssignmentTitle, CourseId, DueDate
-            FROM Assignment
-            WHERE AssignmentId = %s
-        """, (assignment_id,))
-        
-        assignment = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        assignment = fetch_one('assignment_by_id', (assignment_id,))
         
         if assignment:
             return jsonify(assignment), 200
@@ -1232,29 +2969,22 @@ def make_assignment_submission():
 
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
+        cursor = conn.cursor(dictionary=True, prepared=True)
+
         # Check if the user is a student
         acc_type = getAccountType(user_id)
         if acc_type != 'Student':
             return jsonify({"message": "Only students can make submissions"}), 403
         
         # Check if the assignment exists
-        cursor.execute("SELECT AssignmentId FROM Assignment WHERE AssignmentId = %s", (assignment_id,))
-        if cursor.fetchone() is None:
+        assignment = fetch_one('assignment_exists', (assignment_id,))
+        if assignment is None:
             return jsonify({"message": "Assignment not found"}), 404
         
         # Insert the assignment submission
-        cursor.execute("""
-            INSERT INTO AssignmentSubmission (AssignmentId, UserId, SubmissionDate, Grade)
-            VALUES (%s, %s, %s, NULL)
-        """, (assignment_id, user_id, submission_date))
-        conn.commit()
-        
-        submission_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
+        lock_grade_aggregates(cursor, [user_id], [assignment['CourseId']])
+        submission_id = run_statement('insert_submission', (assignment_id, user_id, submission_date)).lastrowid
+        record_submission(cursor, user_id, assignment['CourseId'])
         
         return jsonify({"message": "Assignment submission successful", "submissionId": submission_id}), 201
     
@@ -1263,27 +2993,16 @@ def make_assignment_submission():
         return jsonify({"message": "Failed to make assignment submission"}), 500
 
 
+# Get all submissions for an assignment (?stream=json|ndjson to stream them)
 @app.route('/assignment_submissions/<assignment_id>', methods=['GET'])
 def get_assignment_submissions(assignment_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch all submissions for the assignment, including the user's data
-        cursor.execute("""
-            SELECT AssignmentSubmission.SubmissionId, AssignmentSubmission.AssignmentId, 
-                   AssignmentSubmission.UserId, AssignmentSubmission.SubmissionDate, 
-                   AssignmentSubmission.Grade, User.Username, User.Name
-            FROM AssignmentSubmission
-            JOIN User ON AssignmentSubmission.UserId = User.UserId
-            WHERE AssignmentSubmission.AssignmentId = %s
-            ORDER BY AssignmentSubmission.SubmissionDate ASC
-        """, (assignment_id,))
-        
-        submissions_with_user = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_query(STATEMENTS['assignment_submissions'], (assignment_id,), stream_format)
+
+        submissions_with_user = fetch_all('assignment_submissions', (assignment_id,))
         
         return jsonify(submissions_with_user), 200
     except Exception as e:
@@ -1294,25 +3013,8 @@ def get_assignment_submissions(assignment_id):
 @app.route('/assignment_submissions/submission/<submission_id>', methods=['GET'])
 def get_assignment_submission_by_id(submission_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch the assignment submission by submissionId, along with user and assignment details
-        cursor.execute("""
-            SELECT AssignmentSubmission.SubmissionId, AssignmentSubmission.AssignmentId, 
-                   AssignmentSubmission.UserId, AssignmentSubmission.SubmissionDate, 
-                   AssignmentSubmission.Grade, User.Username, User.Name, 
-                   Assignment.AssignmentTitle, Assignment.DueDate
-            FROM AssignmentSubmission
-            JOIN User ON AssignmentSubmission.UserId = User.UserId
-            JOIN Assignment ON AssignmentSubmission.AssignmentId = Assignment.AssignmentId
-            WHERE AssignmentSubmission.SubmissionId = %s
-        """, (submission_id,))
-        
-        submission = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        submission = fetch_one('submission_by_id', (submission_id,))
         
         if submission:
             return jsonify(submission), 200
@@ -1327,23 +3029,8 @@ def get_assignment_submission_by_id(submission_id):
 @app.route('/user_assignment_submission/<assignment_id>/<user_id>', methods=['GET'])
 def get_user_assignment_submission_with_user_data(assignment_id, user_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Fetch the user's submission for the specified assignment, including the user's data
-        cursor.execute("""
-            SELECT AssignmentSubmission.SubmissionId, AssignmentSubmission.AssignmentId, 
-                   AssignmentSubmission.UserId, AssignmentSubmission.SubmissionDate, 
-                   AssignmentSubmission.Grade, User.Username, User.Name
-            FROM AssignmentSubmission
-            JOIN User ON AssignmentSubmission.UserId = User.UserId
-            WHERE AssignmentSubmission.AssignmentId = %s AND AssignmentSubmission.UserId = %s
-        """, (assignment_id, user_id))
-        
-        submission_with_user_data = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        submission_with_user_data = fetch_one('user_submission', (assignment_id, user_id))
         
         if submission_with_user_data:
             return jsonify(submission_with_user_data), 200
@@ -1355,41 +3042,84 @@ def get_user_assignment_submission_with_user_data(assignment_id, user_id):
 
 
 # Get all assignments for a student
+# url eg: /student_assignments/123?dueAfter=2024-04-18&outstanding=true&includeSubmissions=true
 @app.route('/student_assignments/<int:student_id>', methods=['GET'])
 def get_student_assignments(student_id):
+    # Optional filters
+    try:
+        due_after = parse_date_arg('dueAfter')
+    except ValueError:
+        return jsonify({"error": "Invalid dueAfter date format. Please use YYYY-MM-DD."}), 400
+    outstanding = get_bool_arg('outstanding')
+    include_submissions = get_bool_arg('includeSubmissions')
+
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor(dictionary=True, prepared=True)
         
         # Check if the ID belongs to a student
-        cursor.execute("""
-            SELECT UserId FROM Account WHERE UserId = %s AND AccType = 'Student'
-        """, (student_id,))
-        if cursor.fetchone() is None:
+        if fetch_one('student_exists', (student_id,)) is None:
             return jsonify({"error": "The provided ID does not belong to a student"}), 404
 
-        # Get all courses the student is a member of
-        cursor.execute("""
-            SELECT Course.CourseId, Course.CourseName
-            FROM Membership
-            JOIN Course ON Membership.CourseId = Course.CourseId
-            WHERE Membership.UserId = %s
-        """, (student_id,))
-        courses = cursor.fetchall()
-
-        # For each course, fetch all assignments
-        for course in courses:
-            cursor.execute("""
-                SELECT AssignmentId, AssignmentTitle, DueDate
-                FROM Assignment
-                WHERE CourseId = %s
-            """, (course['CourseId'],))
-            assignments = cursor.fetchall()
-            course['Assignments'] = assignments
+        # Get every course the student is a member of together with its
+        # assignments (and the student's latest submission for each) in one query.
+        # Assignment filters live in the join so courses without matches still show.
+        # Membership is tested with IN, so a duplicated enrollment lists a course once.
+        assignment_filters = ""
+        params = []
+        if due_after:
+            assignment_filters += " AND Assignment.DueDate >= %s"
+            params.append(due_after)
+        if outstanding:
+            assignment_filters += """ AND NOT EXISTS (
+                SELECT 1 FROM AssignmentSubmission
+                WHERE AssignmentSubmission.AssignmentId = Assignment.AssignmentId AND AssignmentSubmission.UserId = %s
+            )"""
+            params.append(student_id)
+        params.extend([student_id, student_id])
+
+        cursor.execute(f"""
+            SELECT Course.CourseId, Course.CourseName,
+                   Assignment.AssignmentId, Assignment.AssignmentTitle, Assignment.DueDate,
+                   Submission.SubmissionId, Submission.SubmissionDate, Submission.Grade
+            FROM Course
+            LEFT JOIN Assignment ON Assignment.CourseId = Course.CourseId{assignment_filters}
+            LEFT JOIN (
+                SELECT AssignmentId, MAX(SubmissionId) AS SubmissionId
+                FROM AssignmentSubmission
+                WHERE UserId = %s
+                GROUP BY AssignmentId
+            ) AS Latest ON Latest.AssignmentId = Assignment.AssignmentId
+            LEFT JOIN AssignmentSubmission AS Submission ON Submission.SubmissionId = Latest.SubmissionId
+            WHERE Course.CourseId IN (SELECT CourseId FROM Membership WHERE UserId = %s)
+            ORDER BY Course.CourseId, Assignment.DueDate, Assignment.AssignmentId
+        """, tuple(params))
+        rows = cursor.fetchall()
+
+        courses = {}
+        for row in rows:
+            course = courses.get(row['CourseId'])
+            if course is None:
+                course = {"CourseId": row['CourseId'], "CourseName": row['CourseName'], "Assignments": []}
+                courses[row['CourseId']] = course
+
+            if row['AssignmentId'] is None:
+                continue
+
+            assignment = {"AssignmentId": row['AssignmentId'], "AssignmentTitle": row['AssignmentTitle'], "DueDate": row['DueDate']}
+            if include_submissions:
+                assignment['Submission'] = None
+                if row['SubmissionId'] is not None:
+                    assignment['Submission'] = {
+                        "SubmissionId": row['SubmissionId'],
+                        "SubmissionDate": row['SubmissionDate'],
+                        "Grade": row['Grade']
+                    }
+            course['Assignments'].append(assignment)
 
         cursor.close()
         conn.close()
-        return jsonify({"studentId": student_id, "courses": courses}), 200
+        return jsonify({"studentId": student_id, "courses": list(courses.values())}), 200
     except Exception as e:
         print(e)  # It's good practice to log the error for debugging purposes
         return jsonify({"error": "Failed to retrieve assignments for the student"}), 500
@@ -1407,26 +3137,31 @@ def assign_grade():
     if not submission_id or grade is None:
         return jsonify({"message": "Missing required fields (submissionId, grade)"}), 400
 
+    try:
+        grade = parse_grade(grade)
+    except ValueError:
+        return jsonify({"message": "Grade must be a number below 1000 with at most 2 decimal places"}), 400
+
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor(dictionary=True, prepared=True)
         
         acc_type = getAccountType(user_id)
         if acc_type != 'Course Maintainer':
             return jsonify({"message": "Only Course Maintainers can assign grades"}), 403
         
-        # Check if the submission exists
-        cursor.execute("SELECT SubmissionId FROM AssignmentSubmission WHERE SubmissionId = %s", (submission_id,))
-        if cursor.fetchone() is None:
+        # Check if the submission exists (locking it, the old grade feeds the report totals)
+        keys = fetch_one('submission_keys', (submission_id,))
+        if keys is None:
+            return jsonify({"message": "Submission not found"}), 404
+        lock_grade_aggregates(cursor, [keys['UserId']], [keys['CourseId']])
+        submission = fetch_one('lock_submission', (submission_id,))
+        if submission is None:
             return jsonify({"message": "Submission not found"}), 404
         
         # Update the submission with the grade
-        cursor.execute("""
-            UPDATE AssignmentSubmission
-            SET Grade = %s
-            WHERE SubmissionId = %s
-        """, (grade, submission_id))
-        conn.commit()
+        run_statement('update_grade', (grade, submission_id))
+        record_grade_changes(cursor, [(submission['UserId'], submission['CourseId'], submission['Grade'], grade)])
         
         cursor.close()
         conn.close()
@@ -1438,28 +3173,663 @@ def assign_grade():
         return jsonify({"message": "Failed to assign grade"}), 500
 
 
+# Assign many grades at once, in one transaction
+# body eg: {"userId": 1, "grades": [{"submissionId": 10, "grade": 85}, {"submissionId": 11, "grade": 72.5}]}
+@app.route('/assign_grades', methods=['POST'])
+def assign_grades():
+    data = request.json
+    user_id = data.get('userId')
+    items = data.get('grades')
+
+    # Validate input
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "Missing required fields (userId, grades)"}), 400
+
+    if len(items) > BULK_MAX_ITEMS:
+        return jsonify({"message": f"At most {BULK_MAX_ITEMS} grades can be assigned at once"}), 400
+
+    # Per-item results, in request order
+    results = []
+    grades = {}
+    for item in items:
+        submission_id = item.get('submissionId') if isinstance(item, dict) else None
+        result = {"submissionId": submission_id, "status": "error"}
+        results.append(result)
+
+        if not isinstance(submission_id, int) or isinstance(submission_id, bool) or item.get('grade') is None:
+            result['message'] = "Missing or invalid submissionId or grade"
+            continue
+        if submission_id in grades:
+            result['message'] = "Duplicate submissionId"
+            continue
+        try:
+            grades[submission_id] = (parse_grade(item['grade']), result)
+        except ValueError:
+            result['message'] = "Grade must be a number below 1000 with at most 2 decimal places"
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True, prepared=True)
+
+        acc_type = getAccountType(user_id)
+        if acc_type != 'Course Maintainer':
+            return jsonify({"message": "Only Course Maintainers can assign grades"}), 403
+
+        # Lock the grade aggregates of the submissions' students and courses
+        # first (see lock_grade_aggregates), from a read without locks
+        submission_ids = list(grades)
+        owners = []
+        for start in range(0, len(submission_ids), BULK_CHUNK_SIZE):
+            chunk = submission_ids[start:start + BULK_CHUNK_SIZE]
+            cursor.execute(f"""
+                SELECT AssignmentSubmission.UserId, Assignment.CourseId
+                FROM AssignmentSubmission
+                JOIN Assignment ON AssignmentSubmission.AssignmentId = Assignment.AssignmentId
+                WHERE AssignmentSubmission.SubmissionId IN ({placeholders(chunk)})
+            """, tuple(chunk))
+            owners.extend(cursor.fetchall())
+        lock_grade_aggregates(cursor, [owner['UserId'] for owner in owners], [owner['CourseId'] for owner in owners])
+
+        # Validate every submission (and lock it) with one query per chunk;
+        # the old grades feed the report totals
+        existing = {}
+        for start in range(0, len(submission_ids), BULK_CHUNK_SIZE):
+            chunk = submission_ids[start:start + BULK_CHUNK_SIZE]
+            cursor.execute(f"""
+                SELECT AssignmentSubmission.SubmissionId, AssignmentSubmission.UserId, AssignmentSubmission.Grade, Assignment.CourseId
+                FROM AssignmentSubmission
+                JOIN Assignment ON AssignmentSubmission.AssignmentId = Assignment.AssignmentId
+                WHERE AssignmentSubmission.SubmissionId IN ({placeholders(chunk)})
+                FOR UPDATE OF AssignmentSubmission
+            """, tuple(chunk))
+            for row in cursor.fetchall():
+                existing[row['SubmissionId']] = row
+
+        updates = []
+        for submission_id, (grade, result) in grades.items():
+            if submission_id not in existing:
+                result['message'] = "Submission not found"
+                continue
+            updates.append((submission_id, grade))
+            result['status'] = "graded"
+
+        if not updates:
+            return jsonify({"message": "No grades were assigned", "graded": 0, "results": results}), 400
+
+        # One UPDATE per chunk (mysql.connector's executemany would send one
+        # statement per row for an UPDATE)
+        for start in range(0, len(updates), BULK_CHUNK_SIZE):
+            chunk = updates[start:start + BULK_CHUNK_SIZE]
+            cursor.execute(f"""
+                UPDATE AssignmentSubmission
+                SET Grade = CASE SubmissionId {' '.join(['WHEN %s THEN %s'] * len(chunk))} END
+                WHERE SubmissionId IN ({placeholders(chunk)})
+            """, (*[value for update in chunk for value in update], *[submission_id for submission_id, grade in chunk]))
+
+        record_grade_changes(cursor, [
+            (existing[submission_id]['UserId'], existing[submission_id]['CourseId'], existing[submission_id]['Grade'], grade)
+            for submission_id, grade in updates
+        ])
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({"message": "Grades assigned", "graded": len(updates), "results": results}), 200
+
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Failed to assign grades"}), 500
+
+
+################################################
+# Gradebook
+
+# Count, sum, min and max of a set of grades
+class GradeStats:
+    def __init__(self):
+        self.count = 0
+        self.total = Decimal(0)
+        self.min = None
+        self.max = None
+
+    def add(self, grade):
+        self.count += 1
+        self.total += grade
+        self.min = grade if self.min is None or grade < self.min else self.min
+        self.max = grade if self.max is None or grade > self.max else self.max
+
+    def summary(self):
+        average = (self.total / self.count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if self.count else None
+        return {"graded": self.count, "average": average, "min": self.min, "max": self.max}
+
+
+# Students with their latest grade per assignment from gradebook_grades rows
+# (UserId, Username, Name, AssignmentId, Grade), which arrive grouped by
+# student. Yields (student, {AssignmentId: grade or None}, GradeStats), one
+# student at a time, so a streamed gradebook holds one student in memory.
+def iter_gradebook_students(rows):
+    student = None
+    for user_id, username, name, assignment_id, grade in rows:
+        if student is None or student[0]['UserId'] != user_id:
+            if student is not None:
+                yield student
+            student = ({"UserId": user_id, "Username": username, "Name": name}, {}, GradeStats())
+        if assignment_id is not None:
+            student[1][assignment_id] = grade
+            if grade is not None:
+                student[2].add(grade)
+    if student is not None:
+        yield student
+
+
+# Stream the gradebook as CSV (one column per assignment) or NDJSON (one
+# student per line), fetching STREAM_FETCH_SIZE rows at a time. Takes over
+# the request's connection like stream_query.
+def stream_gradebook(course_id, assignments, fmt):
+    # Takes over the request's connection like stream_query
+    conn = g.pop('db', None) or get_pool().acquire()
+    dumps = app.json.dumps
+
+    def fetch(cursor):
+        while True:
+            rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def generate():
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(STATEMENTS['gradebook_grades'], (course_id, course_id))
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if fmt == 'csv':
+                writer.writerow(['UserId', 'Username', 'Name']
+                                + [f"{assignment['AssignmentTitle']} ({assignment['AssignmentId']})" for assignment in assignments]
+                                + ['Submitted', 'Graded', 'Average', 'Min', 'Max'])
+
+            pending = 0
+            for student, grades, stats in iter_gradebook_students(fetch(cursor)):
+                summary = stats.summary()
+                if fmt == 'csv':
+                    writer.writerow([student['UserId'], student['Username'], student['Name']]
+                                    + ['' if grades.get(assignment['AssignmentId']) is None else grades[assignment['AssignmentId']] for assignment in assignments]
+                                    + [len(grades)] + ['' if value is None else value for value in summary.values()])
+                else:
+                    buffer.write(dumps({**student, "grades": grades, "submitted": len(grades), **summary}) + '\n')
+
+                pending += 1
+                if pending >= STREAM_FETCH_SIZE:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                    pending = 0
+            yield buffer.getvalue()
+        finally:
+            # With unread rows left (client went away) the pool discards the connection on release
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    if fmt == 'csv':
+        response = Response(stream_with_context(generate()), mimetype='text/csv')
+        response.headers['Content-Disposition'] = f'attachment; filename="gradebook-{course_id}.csv"'
+    else:
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.call_on_close(conn.close)
+    return response
+
+
+# Gradebook of a course: every student's latest grade for every assignment,
+# with per-student and per-assignment aggregates
+# url eg: /gradebook/1001, or /gradebook/1001?format=csv|ndjson to stream an export
+@app.route('/gradebook/<int:course_id>', methods=['GET'])
+def get_gradebook(course_id):
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'csv', 'ndjson'):
+        return jsonify({"message": "format must be one of json, csv, ndjson"}), 400
+
+    try:
+        # Check if the course exists
+        if fetch_one('course_exists', (course_id,)) is None:
+            return jsonify({"message": "Course not found"}), 404
+
+        assignments = fetch_all('gradebook_assignments', (course_id,))
+        if fmt != 'json':
+            return stream_gradebook(course_id, assignments, fmt)
+
+        columns, rows = fetch_rows('gradebook_grades', (course_id, course_id))
+
+        assignment_stats = {assignment['AssignmentId']: GradeStats() for assignment in assignments}
+        submitted = {assignment['AssignmentId']: 0 for assignment in assignments}
+        students = []
+        for student, grades, stats in iter_gradebook_students(rows):
+            for assignment_id, grade in grades.items():
+                submitted[assignment_id] += 1
+                if grade is not None:
+                    assignment_stats[assignment_id].add(grade)
+            students.append({
+                **student,
+                "grades": [grades.get(assignment['AssignmentId']) for assignment in assignments],
+                "submitted": len(grades),
+                **stats.summary()
+            })
+
+        return jsonify({
+            "courseId": course_id,
+            "assignments": [
+                {**assignment, "submitted": submitted[assignment['AssignmentId']], **assignment_stats[assignment['AssignmentId']].summary()}
+                for assignment in assignments
+            ],
+            "students": students
+        }), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Failed to retrieve the gradebook"}), 500
+
+
+################################################
+# Search
+#
+# Full-text search (migrations/0006_search_fulltext.sql) over forum threads,
+# section items, topics and assignments of the courses the user is a member
+# of, ranked by MySQL's natural-language relevance. Each source is one
+# MATCH ... AGAINST query; the requested ones are combined with UNION ALL.
+
+SEARCH_SOURCES = {
+    'thread': """
+        SELECT 'thread' AS ResultType, DiscussionThread.ThreadId AS ResultId, DiscussionForum.CourseId,
+               DiscussionThread.ForumId AS ParentId, DiscussionThread.ThreadTitle AS Title,
+               LEFT(DiscussionThread.ThreadContent, {snippet}) AS Snippet,
+               MATCH (DiscussionThread.ThreadTitle, DiscussionThread.ThreadContent) AGAINST (%s IN NATURAL LANGUAGE MODE) AS Score
+        FROM DiscussionThread
+        JOIN DiscussionForum ON DiscussionThread.ForumId = DiscussionForum.ForumId
+        WHERE MATCH (DiscussionThread.ThreadTitle, DiscussionThread.ThreadContent) AGAINST (%s IN NATURAL LANGUAGE MODE)
+          AND DiscussionForum.CourseId IN ({courses})
+    """,
+    'item': """
+        SELECT 'item' AS ResultType, SectionItem.ItemId AS ResultId, Section.CourseId,
+               SectionItem.SectionId AS ParentId, Section.SectionTitle AS Title,
+               LEFT(SectionItem.SectionContent, {snippet}) AS Snippet,
+               MATCH (SectionItem.SectionContent) AGAINST (%s IN NATURAL LANGUAGE MODE) AS Score
+        FROM SectionItem
+        JOIN Section ON SectionItem.SectionId = Section.SectionId
+        WHERE MATCH (SectionItem.SectionContent) AGAINST (%s IN NATURAL LANGUAGE MODE)
+          AND Section.CourseId IN ({courses})
+    """,
+    'topic': """
+        SELECT 'topic' AS ResultType, Topic.TopicId AS ResultId, Section.CourseId,
+               Topic.SectionId AS ParentId, Topic.TopicTitle AS Title,
+               NULL AS Snippet,
+               MATCH (Topic.TopicTitle) AGAINST (%s IN NATURAL LANGUAGE MODE) AS Score
+        FROM Topic
+        JOIN Section ON Topic.SectionId = Section.SectionId
+        WHERE MATCH (Topic.TopicTitle) AGAINST (%s IN NATURAL LANGUAGE MODE)
+          AND Section.CourseId IN ({courses})
+    """,
+    'assignment': """
+        SELECT 'assignment' AS ResultType, Assignment.AssignmentId AS ResultId, Assignment.CourseId,
+               NULL AS ParentId, Assignment.AssignmentTitle AS Title,
+               NULL AS Snippet,
+               MATCH (Assignment.AssignmentTitle) AGAINST (%s IN NATURAL LANGUAGE MODE) AS Score
+        FROM Assignment
+        WHERE MATCH (Assignment.AssignmentTitle) AGAINST (%s IN NATURAL LANGUAGE MODE)
+          AND Assignment.CourseId IN ({courses})
+    """,
+}
+
+SEARCH_SNIPPET_LENGTH = 200
+SEARCH_MIN_QUERY_LENGTH = 3
+SEARCH_MAX_OFFSET = 1000
+
+
+# Search the courses of a user
+# url eg: /search/123?q=binary trees&types=thread,item&courseId=1001&limit=20&after=<nextCursor>
+# Results are ordered by relevance, which is no stable sort key, so the
+# cursor holds the offset of the next page.
+@app.route('/search/<int:user_id>', methods=['GET'])
+def search(user_id):
+    query = ' '.join(request.args.get('q', '').split())
+    if len(query) < SEARCH_MIN_QUERY_LENGTH:
+        return jsonify({"error": f"q must be at least {SEARCH_MIN_QUERY_LENGTH} characters"}), 400
+
+    types = [name.strip() for name in request.args.get('types', ','.join(SEARCH_SOURCES)).split(',') if name.strip()]
+    if not types or any(name not in SEARCH_SOURCES for name in types):
+        return jsonify({"error": f"types must be a comma separated list of {', '.join(SEARCH_SOURCES)}"}), 400
+
+    try:
+        course_id = request.args.get('courseId', type=int)
+        offset = decode_cursor(request.args['after'])[0] if 'after' in request.args else 0
+        if not isinstance(offset, int) or not 0 <= offset <= SEARCH_MAX_OFFSET:
+            raise ValueError("after cursor must hold an offset")
+    except (ValueError, IndexError):
+        return jsonify({"error": "Invalid after cursor"}), 400
+
+    limit = get_page_size(default=20, max_size=100)
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True, prepared=True)
+
+        # Only the user's courses, optionally narrowed to one of them
+        courses = "SELECT CourseId FROM Membership WHERE UserId = %s"
+        course_params = [user_id]
+        if course_id is not None:
+            courses += " AND CourseId = %s"
+            course_params.append(course_id)
+
+        parts = []
+        params = []
+        for name in dict.fromkeys(types):
+            parts.append(SEARCH_SOURCES[name].format(courses=courses, snippet=SEARCH_SNIPPET_LENGTH))
+            params.extend([query, query, *course_params])
+
+        cursor.execute(f"""
+            {' UNION ALL '.join(parts)}
+            ORDER BY Score DESC, ResultType, ResultId
+            LIMIT %s OFFSET %s
+        """, (*params, limit + 1, offset))
+        results = cursor.fetchall()
+
+        next_cursor = None
+        if len(results) > limit and offset + limit <= SEARCH_MAX_OFFSET:
+            next_cursor = encode_cursor(offset + limit)
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({"query": query, "results": results[:limit], "nextCursor": next_cursor}), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"error": "Failed to search"}), 500
+
+
+################################################
+# Report tables
+#
+# The reports below read from summary tables (report_tables.sql) instead of
+# aggregating Membership/AssignmentSubmission on every call. Writes keep them
+# current inside the request's transaction; rebuild_reports() recomputes them.
+
+# Count new memberships of user_ids in course_id
+def record_enrollments(cursor, course_id, user_ids):
+    if not user_ids:
+        return
+
+    cursor.execute("""
+        INSERT INTO ReportCourseEnrollment (CourseId, CourseName, EnrollmentCount)
+        SELECT CourseId, CourseName, %s FROM Course WHERE CourseId = %s
+        ON DUPLICATE KEY UPDATE EnrollmentCount = EnrollmentCount + %s
+    """, (len(user_ids), course_id, len(user_ids)))
+
+    cursor.execute(f"""
+        INSERT INTO ReportUserCourseCount (UserId, Username, Name, AccType, CourseCount)
+        SELECT User.UserId, User.Username, User.Name, Account.AccType, 1
+        FROM User
+        JOIN Account ON User.UserId = Account.UserId
+        WHERE User.UserId IN ({placeholders(user_ids)})
+        ON DUPLICATE KEY UPDATE CourseCount = CourseCount + 1
+    """, tuple(user_ids))
+
+
+# Running grade aggregates per student (ReportStudentGrades) and per course
+# (ReportCourseGrades): submission count and the sum, count, min and max of
+# the grades. Sums and counts are updated with deltas. A removed grade (a
+# re-grade) can't be taken back out of a min or max, so when it was the
+# current min or max, that key's extremes are recomputed from its submissions.
+GRADE_AGGREGATES = {
+    'ReportStudentGrades': ('UserId', """
+        SELECT AssignmentSubmission.UserId AS AggregateKey, MIN(AssignmentSubmission.Grade) AS MinGrade, MAX(AssignmentSubmission.Grade) AS MaxGrade
+        FROM AssignmentSubmission
+        WHERE AssignmentSubmission.UserId IN ({keys})
+        GROUP BY AssignmentSubmission.UserId
+    """),
+    'ReportCourseGrades': ('CourseId', """
+        SELECT Assignment.CourseId AS AggregateKey, MIN(AssignmentSubmission.Grade) AS MinGrade, MAX(AssignmentSubmission.Grade) AS MaxGrade
+        FROM AssignmentSubmission
+        JOIN Assignment ON AssignmentSubmission.AssignmentId = Assignment.AssignmentId
+        WHERE Assignment.CourseId IN ({keys})
+        GROUP BY Assignment.CourseId
+    """),
+}
+
+
+# Change to one key of a grade aggregate
+class GradeDelta:
+    def __init__(self, submissions=0):
+        self.submissions = submissions
+        self.total = Decimal(0)
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.removed = []
+
+    def change(self, old_grade, new_grade):
+        if old_grade is not None:
+            self.total -= old_grade
+            self.count -= 1
+            self.removed.append(old_grade)
+        if new_grade is not None:
+            self.total += new_grade
+            self.count += 1
+            self.min = new_grade if self.min is None else min(self.min, new_grade)
+            self.max = new_grade if self.max is None else max(self.max, new_grade)
+
+    def is_empty(self):
+        return not (self.submissions or self.total or self.count or self.min is not None or self.removed)
+
+
+# Lock the grade aggregate rows of user_ids and course_ids, creating missing
+# ones. Every writer of AssignmentSubmission calls this before it locks or
+# inserts a submission, and the rows are locked in one order: students, then
+# courses, each by key. Writers of the same student or course queue on its
+# aggregate row rather than on each other's submissions, so the locking read
+# of apply_grade_deltas over those submissions cannot deadlock.
+def lock_grade_aggregates(cursor, user_ids, course_ids):
+    for table, keys in (('ReportStudentGrades', user_ids), ('ReportCourseGrades', course_ids)):
+        key_column = GRADE_AGGREGATES[table][0]
+        cursor.executemany(
+            f"INSERT INTO {table} ({key_column}) VALUES (%s) ON DUPLICATE KEY UPDATE {key_column} = {key_column}",
+            [(key,) for key in sorted(set(keys))]
+        )
+
+
+# Apply {table: {key: GradeDelta}} to the grade aggregate tables, whose rows
+# the caller locked with lock_grade_aggregates
+def apply_grade_deltas(cursor, deltas):
+    for table, key_deltas in deltas.items():
+        key_column, extremes_query = GRADE_AGGREGATES[table]
+        rows = [
+            (key, delta.submissions, delta.total, delta.count, delta.total / delta.count if delta.count > 0 else None, delta.min, delta.max)
+            for key, delta in sorted(key_deltas.items(), key=lambda item: item[0])
+            if not delta.is_empty()
+        ]
+        if not rows:
+            continue
+
+        cursor.executemany(f"""
+            INSERT INTO {table} ({key_column}, SubmissionCount, GradeSum, GradeCount, AverageGrade, MinGrade, MaxGrade)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                SubmissionCount = SubmissionCount + VALUES(SubmissionCount),
+                GradeSum = GradeSum + VALUES(GradeSum),
+                GradeCount = GradeCount + VALUES(GradeCount),
+                AverageGrade = GradeSum / NULLIF(GradeCount, 0),
+                MinGrade = LEAST(COALESCE(MinGrade, VALUES(MinGrade)), COALESCE(VALUES(MinGrade), MinGrade)),
+                MaxGrade = GREATEST(COALESCE(MaxGrade, VALUES(MaxGrade)), COALESCE(VALUES(MaxGrade), MaxGrade))
+        """, rows)
+
+        removed = {key: delta.removed for key, delta in key_deltas.items() if delta.removed}
+        if not removed:
+            continue
+
+        # Keys whose min or max may have been a removed grade
+        keys = sorted(removed)
+        cursor.execute(f"SELECT {key_column}, MinGrade, MaxGrade FROM {table} WHERE {key_column} IN ({placeholders(keys)}) FOR UPDATE", tuple(keys))
+        stale = []
+        for row in cursor.fetchall():
+            key, min_grade, max_grade = row.values() if isinstance(row, dict) else row
+            if any(min_grade is None or grade <= min_grade or grade >= max_grade for grade in removed[key]):
+                stale.append(key)
+        if not stale:
+            continue
+
+        # A locking read sees grades committed since this transaction's
+        # snapshot, which a plain SELECT would miss. Other writers of these
+        # submissions wait on the aggregate rows this transaction holds.
+        cursor.execute(extremes_query.format(keys=placeholders(stale)) + " FOR SHARE OF AssignmentSubmission", tuple(stale))
+        extremes = {}
+        for row in cursor.fetchall():
+            key, min_grade, max_grade = row.values() if isinstance(row, dict) else row
+            extremes[key] = (min_grade, max_grade)
+        cursor.executemany(
+            f"UPDATE {table} SET MinGrade = %s, MaxGrade = %s WHERE {key_column} = %s",
+            [(*extremes.get(key, (None, None)), key) for key in stale]
+        )
+
+
+# Count a new (ungraded) submission of user_id in course_id
+def record_submission(cursor, user_id, course_id):
+    apply_grade_deltas(cursor, {
+        'ReportStudentGrades': {user_id: GradeDelta(submissions=1)},
+        'ReportCourseGrades': {course_id: GradeDelta(submissions=1)},
+    })
+
+
+# Apply grade changes, given as (UserId, CourseId, old grade, new grade) with
+# None for "ungraded", to the running per-student and per-course aggregates
+def record_grade_changes(cursor, changes):
+    deltas = {table: {} for table in GRADE_AGGREGATES}
+    for user_id, course_id, old_grade, new_grade in changes:
+        deltas['ReportStudentGrades'].setdefault(user_id, GradeDelta()).change(old_grade, new_grade)
+        deltas['ReportCourseGrades'].setdefault(course_id, GradeDelta()).change(old_grade, new_grade)
+    apply_grade_deltas(cursor, deltas)
+
+
+# Grades are stored as DECIMAL(5,2); raises ValueError for anything else
+def parse_grade(grade):
+    try:
+        grade = Decimal(str(grade)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid grade: {grade}")
+    if not grade.is_finite() or abs(grade) >= 1000:
+        raise ValueError(f"Invalid grade: {grade}")
+    return grade
+
+
+# Report table -> (columns, query computing its rows from the base tables).
+# The first column is the table's key.
+REPORT_QUERIES = {
+    'ReportCourseEnrollment': ("CourseId, CourseName, EnrollmentCount", """
+        SELECT Course.CourseId, Course.CourseName, COUNT(Membership.UserId)
+        FROM Course
+        JOIN Membership ON Course.CourseId = Membership.CourseId
+        GROUP BY Course.CourseId, Course.CourseName
+    """),
+    'ReportUserCourseCount': ("UserId, Username, Name, AccType, CourseCount", """
+        SELECT User.UserId, User.Username, User.Name, Account.AccType, COUNT(Membership.CourseId)
+        FROM User
+        JOIN Account ON User.UserId = Account.UserId
+        JOIN Membership ON User.UserId = Membership.UserId
+        GROUP BY User.UserId, User.Username, User.Name, Account.AccType
+    """),
+    'ReportStudentGrades': ("UserId, SubmissionCount, GradeSum, GradeCount, AverageGrade, MinGrade, MaxGrade", """
+        SELECT UserId, COUNT(*), COALESCE(SUM(Grade), 0), COUNT(Grade), AVG(Grade), MIN(Grade), MAX(Grade)
+        FROM AssignmentSubmission
+        GROUP BY UserId
+    """),
+    'ReportCourseGrades': ("CourseId, SubmissionCount, GradeSum, GradeCount, AverageGrade, MinGrade, MaxGrade", """
+        SELECT Assignment.CourseId, COUNT(*), COALESCE(SUM(AssignmentSubmission.Grade), 0), COUNT(AssignmentSubmission.Grade),
+               AVG(AssignmentSubmission.Grade), MIN(AssignmentSubmission.Grade), MAX(AssignmentSubmission.Grade)
+        FROM AssignmentSubmission
+        JOIN Assignment ON AssignmentSubmission.AssignmentId = Assignment.AssignmentId
+        GROUP BY Assignment.CourseId
+    """),
+}
+
+# Recompute every report table from the base tables (caller commits)
+def rebuild_reports(cursor):
+    for report_name, (columns, query) in REPORT_QUERIES.items():
+        cursor.execute(f"DELETE FROM {report_name}")
+        cursor.execute(f"INSERT INTO {report_name} ({columns}) {query}")
+        cursor.execute("""
+            INSERT INTO ReportRefresh (ReportName, RefreshedAt) VALUES (%s, NOW())
+            ON DUPLICATE KEY UPDATE RefreshedAt = NOW()
+        """, (report_name,))
+
+
+# Rows of a report table that differ from a recomputation from scratch, as
+# (key, stored row or None, expected row or None)
+def report_drift(cursor, report_name):
+    columns, query = REPORT_QUERIES[report_name]
+    cursor.execute(query)
+    expected = {row[0]: tuple(row) for row in cursor.fetchall()}
+    cursor.execute(f"SELECT {columns} FROM {report_name}")
+    stored = {row[0]: tuple(row) for row in cursor.fetchall()}
+
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(set(stored) | set(expected))
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+@app.cli.command('rebuild-reports')
+def rebuild_reports_command():
+    """Rebuild the materialized report tables from scratch."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    rebuild_reports(cursor)
+    conn.commit()
+    cursor.close()
+    print("Report tables rebuilt")
+
+
+@app.cli.command('verify-reports')
+@click.option('--show', default=10, show_default=True, help='Drifted rows to print per table.')
+@click.option('--fix', is_flag=True, help='Rebuild the report tables if any of them drifted.')
+def verify_reports_command(show, fix):
+    """Recompute the report tables from scratch and report rows that drifted."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    drifted = 0
+    for report_name in REPORT_QUERIES:
+        drift = report_drift(cursor, report_name)
+        drifted += len(drift)
+        print(f"{report_name}: {len(drift)} drifted row(s)")
+        for key, stored, expected in drift[:show]:
+            print(f"  {key}: stored {stored}, expected {expected}")
+
+    if drifted and fix:
+        rebuild_reports(cursor)
+        conn.commit()
+        print("Report tables rebuilt")
+    cursor.close()
+
+    if drifted and not fix:
+        raise SystemExit(f"{drifted} report row(s) drifted, rerun with --fix to rebuild")
+
+
+# Report rows plus the time their table was last rebuilt from scratch
+def report_response(report_name, rows):
+    refresh = fetch_one('report_refreshed_at', (report_name,))
+
+    response = jsonify(rows)
+    response.headers['X-Report-Refreshed-At'] = refresh['RefreshedAt'].isoformat() if refresh else 'never'
+    return response
+
+
 # Get all courses with 50 or more students
 @app.route('/courses_with_many_students', methods=['GET'])
 def get_courses_with_many_students():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Execute the query
-        cursor.execute("""
-            SELECT Course.CourseId, Course.CourseName, COUNT(Membership.UserId) AS StudentCount
-            FROM Course
-            JOIN Membership ON Course.CourseId = Membership.CourseId
-            GROUP BY Course.CourseId
-            HAVING COUNT(Membership.UserId) >= 50
-        """)
+        courses = fetch_all('courses_many_students')
+        response = report_response('ReportCourseEnrollment', courses)
         
-        courses = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        return jsonify(courses), 200
+        return response, 200
     except Exception as e:
         print(e)
         return jsonify({"message": "Failed to retrieve courses with 50 or more students"}), 500
@@ -1469,26 +3839,11 @@ def get_courses_with_many_students():
 @app.route('/students_with_many_courses', methods=['GET'])
 def get_students_with_many_courses():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Execute the query
-        cursor.execute("""
-            SELECT User.UserId, User.Username, User.Name, COUNT(Membership.CourseId) AS CourseCount
-            FROM User
-            JOIN Account ON User.UserId = Account.UserId
-            JOIN Membership ON User.UserId = Membership.UserId
-            WHERE Account.AccType = 'Student'
-            GROUP BY User.UserId
-            HAVING COUNT(Membership.CourseId) >= 5
-        """)
-        
-        students = cursor.fetchall()
+        students = fetch_all('students_many_courses')
+        response = report_response('ReportUserCourseCount', students)
         
-        cursor.close()
-        conn.close()
-        
-        return jsonify(students), 200
+        return response, 200
     except Exception as e:
         print(e)
         return jsonify({"message": "Failed to retrieve students enrolled in 5 or more courses"}), 500
@@ -1498,26 +3853,11 @@ def get_students_with_many_courses():
 @app.route('/maintainers_with_many_courses', methods=['GET'])
 def get_maintainers_with_many_courses():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Execute the query
-        cursor.execute("""
-            SELECT User.UserId, User.Username, User.Name, COUNT(Membership.CourseId) AS CourseCount
-            FROM User
-            JOIN Account ON User.UserId = Account.UserId
-            JOIN Membership ON User.UserId = Membership.UserId
-            WHERE Account.AccType = 'Course Maintainer'
-            GROUP BY User.UserId
-            HAVING COUNT(Membership.CourseId) >= 3
-        """)
-        
-        maintainers = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        maintainers = fetch_all('maintainers_many_courses')
+        response = report_response('ReportUserCourseCount', maintainers)
         
-        return jsonify(maintainers), 200
+        return response, 200
     except Exception as e:
         print(e)
         return jsonify({"message": "Failed to retrieve Course Maintainers teaching 3 or more courses"}), 500
@@ -1527,25 +3867,11 @@ def get_maintainers_with_many_courses():
 @app.route('/top_enrolled_courses', methods=['GET'])
 def get_top_enrolled_courses():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Execute the query
-        cursor.execute("""
-            SELECT Course.CourseId, Course.CourseName, COUNT(Membership.UserId) AS EnrollmentCount
-            FROM Course
-            JOIN Membership ON Course.CourseId = Membership.CourseId
-            GROUP BY Course.CourseId
-            ORDER BY EnrollmentCount DESC
-            LIMIT 10
-        """)
-        
-        top_courses = cursor.fetchall()
+        top_courses = fetch_all('top_enrolled_courses')
+        response = report_response('ReportCourseEnrollment', top_courses)
         
-        cursor.close()
-        conn.close()
-        
-        return jsonify(top_courses), 200
+        return response, 200
     except Exception as e:
         print(e)
         return jsonify({"message": "Failed to retrieve the 10 most enrolled courses"}), 500
@@ -1555,30 +3881,315 @@ def get_top_enrolled_courses():
 @app.route('/top_students_by_average', methods=['GET'])
 def get_top_students_by_average():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Execute the query to calculate the average grades and fetch the top 10 students
-        cursor.execute("""
-            SELECT User.UserId, User.Username, User.Name, AVG(AssignmentSubmission.Grade) AS AverageGrade
-            FROM User
-            JOIN AssignmentSubmission ON User.UserId = AssignmentSubmission.UserId
-            WHERE AssignmentSubmission.Grade IS NOT NULL
-            GROUP BY User.UserId
-            ORDER BY AverageGrade DESC
-            LIMIT 10
-        """)
-        
-        top_students = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        # Read the top 10 running averages, then join the 10 users
+        top_students = fetch_all('top_students_by_average')
+        response = report_response('ReportStudentGrades', top_students)
         
-        return jsonify(top_students), 200
+        return response, 200
     except Exception as e:
         print(e)
         return jsonify({"message": "Failed to retrieve the top 10 students with the highest overall averages"}), 500
-    
+
+
+# Grade statistics of a course (submissions, graded, average, min, max)
+@app.route('/course/grade_stats/<int:course_id>', methods=['GET'])
+def get_course_grade_stats(course_id):
+    try:
+        stats = fetch_one('course_grade_stats', (course_id,))
+        if stats is None:
+            if fetch_one('course_exists', (course_id,)) is None:
+                return jsonify({"message": "Course not found"}), 404
+            stats = {"CourseId": course_id, "SubmissionCount": 0, "GradeCount": 0, "AverageGrade": None, "MinGrade": None, "MaxGrade": None}
+
+        return report_response('ReportCourseGrades', stats), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Failed to retrieve the course's grade statistics"}), 500
+
+
+# Grade statistics of a student across all their courses
+@app.route('/student/grade_stats/<int:student_id>', methods=['GET'])
+def get_student_grade_stats(student_id):
+    try:
+        stats = fetch_one('student_grade_stats', (student_id,))
+        if stats is None:
+            if fetch_one('student_exists', (student_id,)) is None:
+                return jsonify({"error": "The provided ID does not belong to a student"}), 404
+            stats = {"UserId": student_id, "SubmissionCount": 0, "GradeCount": 0, "AverageGrade": None, "MinGrade": None, "MaxGrade": None}
+
+        return report_response('ReportStudentGrades', stats), 200
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "Failed to retrieve the student's grade statistics"}), 500
+
+
+################################################
+# Migrations
+#
+# Schema changes live in migrations/NNNN_description.sql and are applied in
+# order by `flask --app app migrate`. Applied versions are recorded in
+# SchemaMigration.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+def list_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if filename.endswith('.sql'):
+            version = filename.split('_', 1)[0]
+            migrations.append((version, filename))
+    return migrations
+
+
+def read_migration_statements(filename):
+    with open(os.path.join(MIGRATIONS_DIR, filename)) as file:
+        lines = [line for line in file if not line.strip().startswith('--')]
+    return [statement.strip() for statement in ''.join(lines).split(';') if statement.strip()]
+
+
+def get_applied_migrations(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaMigration (
+            Version VARCHAR(32) PRIMARY KEY,
+            Name VARCHAR(255) NOT NULL,
+            AppliedAt DATETIME NOT NULL
+        )
+    """)
+    cursor.execute("SELECT Version FROM SchemaMigration")
+    return {row[0] for row in cursor.fetchall()}
+
+
+@app.cli.command('migrate')
+@click.option('--baseline', metavar='VERSION', type=click.IntRange(min=0), help='Mark migrations up to VERSION (eg. 3 or 0003) as applied without running them.')
+@click.option('--dry-run', is_flag=True, help='Only list the pending migrations.')
+def migrate_command(baseline, dry_run):
+    """Apply pending migrations from the migrations/ directory."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    applied = get_applied_migrations(cursor)
+
+    pending = [(version, filename) for version, filename in list_migrations() if version not in applied]
+    if not pending:
+        print("Database is up to date")
+        return
+
+    for version, filename in pending:
+        if dry_run:
+            print(f"Pending: {filename}")
+            continue
+
+        # Versions are compared as numbers, so --baseline 2 stops before 0003
+        if baseline is not None and int(version) <= baseline:
+            print(f"Baselined {filename}")
+        else:
+            print(f"Applying {filename}")
+            # MySQL commits DDL implicitly, so a failure leaves earlier statements applied
+            for statement in read_migration_statements(filename):
+                cursor.execute(statement)
+
+        cursor.execute("INSERT INTO SchemaMigration (Version, Name, AppliedAt) VALUES (%s, %s, NOW())", (version, filename))
+        conn.commit()
+
+    cursor.close()
+
+
+################################################
+# Query plan check
+#
+# `flask --app app explain-check` calls every route with ids sampled from the
+# database (write routes with sample bodies, rolled back), EXPLAINs each
+# statement the route ran, and fails if any of them scans a whole table that
+# holds at least --min-rows rows.
+
+# Route arguments, filled from sample_route_args()
+EXPLAIN_CHECK_SAMPLES = {
+    'user_id': "SELECT Membership.UserId FROM Membership JOIN Account ON Membership.UserId = Account.UserId WHERE Account.AccType = 'Student' LIMIT 1",
+    'student_id': "SELECT Membership.UserId FROM Membership JOIN Account ON Membership.UserId = Account.UserId WHERE Account.AccType = 'Student' LIMIT 1",
+    'maintainer_id': "SELECT Membership.UserId FROM Membership JOIN Account ON Membership.UserId = Account.UserId WHERE Account.AccType = 'Course Maintainer' LIMIT 1",
+    'course_id': "SELECT CourseId FROM Section LIMIT 1",
+    'member_id': "SELECT MemberId FROM Membership LIMIT 1",
+    'event_id': "SELECT EventId FROM CalendarEvent LIMIT 1",
+    'forum_id': "SELECT ForumId FROM DiscussionThread LIMIT 1",
+    'thread_id': "SELECT ParentThreadId FROM DiscussionThread WHERE ParentThreadId IS NOT NULL LIMIT 1",
+    'section_id': "SELECT SectionId FROM SectionItem LIMIT 1",
+    'assignment_id': "SELECT AssignmentId FROM AssignmentSubmission LIMIT 1",
+    'submission_id': "SELECT SubmissionId FROM AssignmentSubmission LIMIT 1",
+    'admin_id': "SELECT UserId FROM Account WHERE AccType = 'Admin' LIMIT 1",
+}
+
+# Query strings for routes that need them
+EXPLAIN_CHECK_QUERY_STRINGS = {
+    'get_daily_calendar_events': lambda args: {'date': datetime.now().strftime('%Y-%m-%d')},
+    'get_calendar_range_events': lambda args: {'view': 'month'},
+    'get_many_courses_content': lambda args: {'courseIds': args['course_id']},
+    'search': lambda args: {'q': 'introduction'},
+}
+
+# Request bodies for the write routes. Their transactions are rolled back,
+# though AUTO_INCREMENT values they took stay used. New rows use an id that
+# sample data never has.
+EXPLAIN_CHECK_NEW_ID = 2147483647
+EXPLAIN_CHECK_BODIES = {
+    'register_user': lambda args: {'userId': EXPLAIN_CHECK_NEW_ID, 'username': 'explain', 'name': 'Explain Check', 'password': 'explain', 'accType': 'Student'},
+    'register_users_bulk': lambda args: [{'userId': EXPLAIN_CHECK_NEW_ID, 'username': 'explain', 'name': 'Explain Check', 'password': 'explain', 'accType': 'Student'}],
+    'login': lambda args: {'userId': args['user_id'], 'password': 'explain'},
+    'create_course': lambda args: {'userId': args['admin_id'], 'courseId': EXPLAIN_CHECK_NEW_ID, 'courseName': 'Explain Check', 'period': '2024'},
+    'register_course': lambda args: {'userId': args['student_id'], 'courseId': args['course_id']},
+    'register_course_bulk': lambda args: {'courseId': args['course_id'], 'userIds': [args['student_id'], args['maintainer_id']]},
+    'create_calendar_event': lambda args: {'courseId': args['course_id'], 'startDate': '2024-04-01', 'endDate': '2024-04-02', 'eventTitle': 'Explain', 'description': 'Explain'},
+    'create_discussion_forum': lambda args: {'courseId': args['course_id'], 'forumTitle': 'Explain'},
+    'create_thread': lambda args: {'userId': args['user_id'], 'forumId': args['forum_id'], 'threadTitle': 'Explain', 'threadContent': 'Explain'},
+    'create_section': lambda args: {'userId': args['maintainer_id'], 'courseId': args['course_id'], 'sectionTitle': 'Explain'},
+    'create_section_item': lambda args: {'sectionId': args['section_id'], 'sectionContent': 'Explain'},
+    'create_topic': lambda args: {'sectionId': args['section_id'], 'topicTitle': 'Explain'},
+    'create_assignment': lambda args: {'courseId': args['course_id'], 'assignmentTitle': 'Explain', 'dueDate': '2024-04-01'},
+    'make_assignment_submission': lambda args: {'userId': args['student_id'], 'assignmentId': args['assignment_id']},
+    'assign_grade': lambda args: {'userId': args['maintainer_id'], 'submissionId': args['submission_id'], 'grade': 50},
+    'assign_grades': lambda args: {'userId': args['maintainer_id'], 'grades': [{'submissionId': args['submission_id'], 'grade': 50}]},
+}
+
+# Endpoints that are not database reads
+EXPLAIN_CHECK_SKIP = {'static', 'logout', 'get_user_session'}
+
+# Statements MySQL can EXPLAIN
+EXPLAINABLE_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def sample_route_args(cursor):
+    args = {}
+    for name, query in EXPLAIN_CHECK_SAMPLES.items():
+        cursor.execute(query)
+        row = cursor.fetchone()
+        args[name] = row[0] if row else 1
+    return args
+
+
+def explain_full_scans(cursor, statement, params, min_rows):
+    cursor.execute("EXPLAIN " + statement, params)
+    columns = [column[0] for column in cursor.description]
+    scans = []
+    for row in cursor.fetchall():
+        plan = dict(zip(columns, row))
+        table = plan.get('table') or ''
+        # Derived tables, subquery results and the rows a recursive CTE
+        # feeds back into itself are scanned by design
+        if 'Recursive' in (plan.get('Extra') or ''):
+            continue
+        if plan.get('type') == 'ALL' and not table.startswith('<') and (plan.get('rows') or 0) >= min_rows:
+            scans.append(plan)
+    return scans
+
+
+@app.cli.command('explain-check')
+@click.option('--min-rows', default=1000, show_default=True, help='Full scans of tables with fewer estimated rows are allowed.')
+def explain_check_command(min_rows):
+    """EXPLAIN the queries of every route and fail on full table scans. Write routes run with sample bodies and are rolled back."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    args = sample_route_args(cursor)
+
+    captured = []
+    def capture(statement, params, elapsed, rowcount):
+        # executemany reports every parameter set; one explains the statement
+        if params and isinstance(params, list) and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        captured.append((statement, params))
+
+    failures = 0
+    explained = 0
+    skipped_routes = []
+    skipped_statements = []
+    client = app.test_client()
+    statement_listeners.append(capture)
+    app.config['DB_ROLLBACK_ONLY'] = True
+    try:
+        for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+            if rule.endpoint in EXPLAIN_CHECK_SKIP:
+                skipped_routes.append((rule.rule, "not a database route"))
+                continue
+            if 'GET' in rule.methods:
+                method = 'GET'
+                body = None
+            elif 'POST' in rule.methods and rule.endpoint in EXPLAIN_CHECK_BODIES:
+                method = 'POST'
+                body = EXPLAIN_CHECK_BODIES[rule.endpoint](args)
+            else:
+                skipped_routes.append((rule.rule, "no sample request body"))
+                continue
+
+            url = rule.rule
+            for name in rule.arguments:
+                url = url.replace(f'<int:{name}>', str(args[name])).replace(f'<{name}>', str(args[name]))
+            query_string = EXPLAIN_CHECK_QUERY_STRINGS.get(rule.endpoint, lambda args: {})(args)
+
+            del captured[:]
+            response = client.open(url, method=method, query_string=query_string, json=body)
+            response.close()
+            print(f"{rule.endpoint} {method} {url} -> {response.status_code}, {len(captured)} queries")
+
+            for statement, params in list(captured):
+                if not statement.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS):
+                    skipped_statements.append((rule.endpoint, statement))
+                    continue
+                try:
+                    scans = explain_full_scans(cursor, statement, params, min_rows)
+                except mysql.connector.Error as e:
+                    skipped_statements.append((rule.endpoint, f"{statement} ({e})"))
+                    continue
+                explained += 1
+                for scan in scans:
+                    failures += 1
+                    print(f"  FULL SCAN of {scan['table']} (~{scan['rows']} rows): {' '.join(statement.split())}")
+    finally:
+        app.config['DB_ROLLBACK_ONLY'] = False
+        statement_listeners.remove(capture)
+        conn.rollback()
+        cursor.close()
+
+    for url, reason in skipped_routes:
+        print(f"Skipped route {url}: {reason}")
+    for endpoint, statement in skipped_statements:
+        print(f"Skipped statement of {endpoint}: {' '.join(statement.split())}")
+
+    if failures:
+        raise SystemExit(f"{failures} full table scan(s) found")
+    print(f"No full table scans found in {explained} statement(s); "
+          f"{len(skipped_routes)} route(s) and {len(skipped_statements)} statement(s) were not checked")
+
+
+################################################
+# Monitoring
+
+# Connection pool usage (in-use, waiting, wait times)
+@app.route('/stats/db_pool', methods=['GET'])
+def get_db_pool_stats():
+    return jsonify(get_pool().stats()), 200
+
+# Identity cache hit/miss counters
+@app.route('/stats/identity_cache', methods=['GET'])
+def get_identity_cache_stats():
+    return jsonify(identity_cache.stats()), 200
+
+# Statements over the slow-query threshold, newest first (admins only)
+# url eg: /admin/slow_queries?route=/student_courses/<student_id>&minElapsed=1&limit=50
+@app.route('/admin/slow_queries', methods=['GET'])
+def get_slow_queries():
+    if not current_user.is_authenticated or current_user.accType != 'Admin':
+        return jsonify({"message": "Only admins can view the slow-query log"}), 403
+
+    try:
+        min_elapsed = float(request.args.get('minElapsed', 0))
+    except ValueError:
+        return jsonify({"message": "minElapsed must be a number of seconds"}), 400
+
+    entries = read_slow_queries(request.args.get('route'), min_elapsed, get_page_size())
+    return jsonify({"threshold": SLOW_QUERY_THRESHOLD, "slowQueries": entries}), 200
+
+# Per-route request metrics for Prometheus
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
 
 ################################################
 # Error handlers
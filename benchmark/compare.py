@@ -0,0 +1,48 @@
+import argparse
+import json
+
+
+# Compares two run.py reports endpoint by endpoint, eg. before and after a commit
+
+
+def change(before, after):
+    if not before:
+        return '     n/a'
+    return f"{(after - before) / before * 100:+7.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    parser.add_argument('baseline', help="Report of the run to compare against")
+    parser.add_argument('candidate', help="Report of the new run")
+    parser.add_argument('--metric', default='p95', choices=['mean', 'p50', 'p95', 'p99', 'max'], help="Latency to compare. Default: p95")
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.candidate) as candidate_file:
+        candidate = json.load(candidate_file)
+
+    print(f"baseline:  {baseline['meta']['commit']} ({baseline['meta']['startedAt']})")
+    print(f"candidate: {candidate['meta']['commit']} ({candidate['meta']['startedAt']})")
+    if baseline['meta']['dataset'] != candidate['meta']['dataset']:
+        print("warning: the runs used different datasets")
+
+    metric = args.metric
+    print(f"{'endpoint':<60} {'req/s':>17} {'change':>8} {metric + ' ms':>19} {'change':>8}")
+
+    rows = [(label, baseline['endpoints'].get(label), candidate['endpoints'].get(label))
+            for label in sorted(set(baseline['endpoints']) | set(candidate['endpoints']))]
+    rows.append(("TOTAL", baseline['total'], candidate['total']))
+    for label, before, after in rows:
+        if before is None or after is None:
+            print(f"{label:<60} only in {'candidate' if before is None else 'baseline'}")
+            continue
+        before_latency = before['latencyMs'][metric]
+        after_latency = after['latencyMs'][metric]
+        print(f"{label:<60} {before['throughput']:>8} {after['throughput']:>8} {change(before['throughput'], after['throughput'])}"
+              f" {before_latency:>9} {after_latency:>9} {change(before_latency, after_latency)}")
+
+
+if __name__ == '__main__':
+    main()
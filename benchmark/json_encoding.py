@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app import app, orjson, OrjsonProvider
+
+
+# Times the JSON encoding of the largest list responses, without a database,
+# from dict rows as fetch_all hands them over to response bytes: Flask's
+# encoder against the orjson provider. Both must produce the same JSON.
+
+# (columns, row factory) shaped like the rows of the routes they are named after
+def submission_row(rng, index):
+    return (index, 4001, 1000 + index, date(2024, 4, 1) + timedelta(days=rng.randrange(30)),
+            Decimal(rng.randrange(0, 10000)) / 100, f"user{index}", f"Student Name {index}")
+
+def event_row(rng, index):
+    start = datetime(2024, 1, 8, 9) + timedelta(days=rng.randrange(120), hours=rng.randrange(8))
+    return (index, 1001, start, start + timedelta(hours=2), f"Event {index}", "Lecture in room " + str(rng.randrange(100)) * 20)
+
+def member_row(rng, index):
+    return (index, 1001, 1000 + index, f"user{index}", f"Student Name {index}", 'Student')
+
+SHAPES = {
+    'GET /assignment_submissions/<assignment_id>': (
+        ('SubmissionId', 'AssignmentId', 'UserId', 'SubmissionDate', 'Grade', 'Username', 'Name'), submission_row),
+    'GET /calendar/course/<course_id>': (
+        ('EventId', 'CourseId', 'StartDate', 'EndDate', 'EventTitle', 'Description'), event_row),
+    'GET /members/<course_id>': (
+        ('MemberId', 'CourseId', 'UserId', 'Username', 'Name', 'AccType'), member_row),
+}
+
+
+def time_path(encode, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None or elapsed < best else best
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding of large list responses.")
+    parser.add_argument('--rows', type=int, default=20000, help="Rows per response. Default: 20000")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per path, the fastest is kept. Default: 5")
+    parser.add_argument('--seed', type=int, default=3161)
+    args = parser.parse_args()
+
+    if orjson is None:
+        raise SystemExit("orjson is not installed, there is nothing to compare against")
+
+    rng = random.Random(args.seed)
+    providers = {'flask': DefaultJSONProvider(app), 'orjson': OrjsonProvider(app)}
+
+    print(f"{'endpoint':<46} {'encoder':<20} {'ms':>9} {'speedup':>8}")
+    with app.app_context():
+        for label, (columns, make_row) in SHAPES.items():
+            rows = [dict(zip(columns, make_row(rng, index))) for index in range(args.rows)]
+
+            def encoder(provider):
+                return lambda: provider.response(rows).get_data()
+
+            paths = [(name, encoder(provider)) for name, provider in providers.items()]
+
+            baseline = None
+            expected = None
+            for name, encode in paths:
+                elapsed, body = time_path(encode, args.repeat)
+                decoded = json.loads(body)
+                if expected is None:
+                    baseline, expected = elapsed, decoded
+                elif decoded != expected:
+                    raise SystemExit(f"{label}: {name} output differs from Flask's encoder")
+                print(f"{label:<46} {name:<20} {elapsed * 1000:>9.1f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
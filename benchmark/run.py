@@ -0,0 +1,316 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+
+# Drives the API with concurrent synthetic clients. Each client repeatedly
+# picks a scenario (a page load: the requests one screen of the frontend
+# makes) by weight and runs its requests in order on a keep-alive
+# connection. Latencies are recorded per route and written to a JSON report.
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Every scenario takes (rng, dataset) and returns [(label, method, path, body)].
+# The label is the route template, so samples group per endpoint.
+
+def dashboard(rng, data):
+    student_id = rng.choice(data['students'])
+    today = datetime.now().strftime('%Y-%m-%d')
+    return [
+        ("GET /course/student/<student_id>", 'GET', f"/course/student/{student_id}", None),
+        ("GET /calendar/user/range/<user_id>", 'GET', f"/calendar/user/range/{student_id}?view=week", None),
+        ("GET /calendar/user/daily/<user_id>", 'GET', f"/calendar/user/daily/{student_id}?date={today}", None),
+        ("GET /student_assignments/<student_id>", 'GET', f"/student_assignments/{student_id}?outstanding=true", None),
+    ]
+
+
+def course_page(rng, data):
+    course_id = rng.choice(data['courses'])
+    return [
+        ("GET /course/<course_id>", 'GET', f"/course/{course_id}", None),
+        ("GET /course/content/<course_id>", 'GET', f"/course/content/{course_id}", None),
+        ("GET /members/<course_id>", 'GET', f"/members/{course_id}", None),
+        ("GET /calendar/course/<course_id>", 'GET', f"/calendar/course/{course_id}", None),
+        ("GET /assignment/course/<course_id>", 'GET', f"/assignment/course/{course_id}", None),
+        ("GET /forum/<course_id>", 'GET', f"/forum/{course_id}", None),
+    ]
+
+
+def forum_browsing(rng, data):
+    forum_id = rng.choice(data['forums'])
+    thread_id = rng.choice(data['threads'])
+    return [
+        ("GET /get-forum/<forum_id>", 'GET', f"/get-forum/{forum_id}", None),
+        ("GET /forum_tree/<forum_id>", 'GET', f"/forum_tree/{forum_id}", None),
+        ("GET /forum_threads/<forum_id>", 'GET', f"/forum_threads/{forum_id}", None),
+        ("GET /thread_tree/<thread_id>", 'GET', f"/thread_tree/{thread_id}", None),
+        ("GET /thread_replies/<thread_id>", 'GET', f"/thread_replies/{thread_id}", None),
+    ]
+
+
+def grading(rng, data):
+    work = rng.choice(data['grading'])
+    submission_ids = work['submissionIds']
+    submission_id = rng.choice(submission_ids)
+    batch = rng.sample(submission_ids, min(len(submission_ids), 5))
+    return [
+        ("GET /assignment/<assignment_id>", 'GET', f"/assignment/{work['assignmentId']}", None),
+        ("GET /assignment_submissions/<assignment_id>", 'GET', f"/assignment_submissions/{work['assignmentId']}", None),
+        ("GET /assignment_submissions/submission/<submission_id>", 'GET', f"/assignment_submissions/submission/{submission_id}", None),
+        ("POST /assign_grade", 'POST', "/assign_grade",
+         {"userId": work['maintainerId'], "submissionId": submission_id, "grade": rng.randint(0, 100)}),
+        ("POST /assign_grades", 'POST', "/assign_grades",
+         {"userId": work['maintainerId'], "grades": [{"submissionId": sid, "grade": rng.randint(0, 100)} for sid in batch]}),
+    ]
+
+
+# The read routes not covered by the page loads above, so every route is measured
+def sweep(rng, data):
+    student_id = rng.choice(data['students'])
+    maintainer_id = rng.choice(data['maintainers'])
+    section_id = rng.choice(data['sections'])
+    assignment_id = rng.choice(data['assignments'])
+    courses = rng.sample(data['courses'], min(len(data['courses']), 3))
+    # Manifests written before search was added have no terms
+    term = rng.choice(data.get('searchTerms') or ['introduction'])
+    requests = [
+        ("GET /users", 'GET', "/users?" + urlencode({"limit": 100}), None),
+        ("GET /user/<user_id>", 'GET', f"/user/{student_id}", None),
+        ("GET /course", 'GET', "/course", None),
+        ("GET /course/maintainer/<maintainer_id>", 'GET', f"/course/maintainer/{maintainer_id}", None),
+        ("GET /course_member/<member_id>", 'GET', f"/course_member/{rng.choice(data['members'])}", None),
+        ("GET /calendar/user/<user_id>", 'GET', f"/calendar/user/{student_id}?limit=50", None),
+        ("GET /section/<course_id>", 'GET', f"/section/{courses[0]}", None),
+        ("GET /section_items/<section_id>", 'GET', f"/section_items/{section_id}", None),
+        ("GET /topic/<section_id>", 'GET', f"/topic/{section_id}", None),
+        ("GET /course/content", 'GET', "/course/content?" + urlencode({"courseIds": ','.join(map(str, courses))}), None),
+        ("GET /user_assignment_submission/<assignment_id>/<user_id>", 'GET', f"/user_assignment_submission/{assignment_id}/{student_id}", None),
+        ("GET /courses_with_many_students", 'GET', "/courses_with_many_students", None),
+        ("GET /students_with_many_courses", 'GET', "/students_with_many_courses", None),
+        ("GET /maintainers_with_many_courses", 'GET', "/maintainers_with_many_courses", None),
+        ("GET /top_enrolled_courses", 'GET', "/top_enrolled_courses", None),
+        ("GET /top_students_by_average", 'GET', "/top_students_by_average", None),
+        ("GET /search/<user_id>", 'GET', f"/search/{student_id}?" + urlencode({"q": term}), None),
+        ("GET /gradebook/<course_id>", 'GET', f"/gradebook/{courses[0]}", None),
+        ("GET /gradebook/<course_id>?format=csv", 'GET', f"/gradebook/{courses[0]}?format=csv", None),
+        ("GET /course/grade_stats/<course_id>", 'GET', f"/course/grade_stats/{courses[0]}", None),
+        ("GET /student/grade_stats/<student_id>", 'GET', f"/student/grade_stats/{student_id}", None),
+    ]
+    if data['events']:
+        requests.append(("GET /calendar/<event_id>", 'GET', f"/calendar/{rng.choice(data['events'])}", None))
+    return requests
+
+
+# The bulk write endpoints. Not in the default mix: every run adds users and
+# memberships, so later runs see a different dataset.
+def bulk(rng, data):
+    course_id = rng.choice(data['courses'])
+    students = rng.sample(data['students'], min(len(data['students']), 20))
+    # Ids far above the seeded ones; a clash is reported per row
+    new_ids = rng.sample(range(1_000_000_000, 2_000_000_000), 20)
+    return [
+        ("POST /course/register/bulk", 'POST', "/course/register/bulk", {"courseId": course_id, "userIds": students}),
+        ("POST /register/bulk", 'POST', "/register/bulk",
+         [{"userId": user_id, "username": f"bench{user_id}", "name": "Benchmark User", "password": "benchmark", "accType": "Student"}
+          for user_id in new_ids]),
+    ]
+
+
+SCENARIOS = {
+    'dashboard': dashboard,
+    'course': course_page,
+    'forum': forum_browsing,
+    'grading': grading,
+    'sweep': sweep,
+    'bulk': bulk,
+}
+
+DEFAULT_MIX = 'dashboard=4,course=3,forum=2,grading=1,sweep=1'
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}. Choose from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class Client(threading.Thread):
+    def __init__(self, index, base_url, dataset, mix, seed, warmup_until, stop_at):
+        super().__init__(name=f"client-{index}", daemon=True)
+        self.url = urlsplit(base_url)
+        self.dataset = dataset
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random(seed + index)
+        self.warmup_until = warmup_until
+        self.stop_at = stop_at
+        self.conn = None
+        # label -> {"latencies": [...], "statuses": {status: count}, "bytes": n}
+        self.samples = {}
+
+    def connect(self):
+        connection_class = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+        self.conn = connection_class(self.url.hostname, self.url.port, timeout=60)
+
+    def request(self, method, path, body):
+        headers = {'Accept': 'application/json'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.connect()
+            self.conn.request(method, self.url.path.rstrip('/') + path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            size = len(response.read())
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            size = 0
+            status = 'error'
+        return time.perf_counter() - started, status, size
+
+    def run(self):
+        while time.monotonic() < self.stop_at:
+            scenario = SCENARIOS[self.rng.choices(self.names, weights=self.weights)[0]]
+            for label, method, path, body in scenario(self.rng, self.dataset):
+                if time.monotonic() >= self.stop_at:
+                    break
+                elapsed, status, size = self.request(method, path, body)
+                if time.monotonic() < self.warmup_until:
+                    continue
+                sample = self.samples.setdefault(label, {"latencies": [], "statuses": {}, "bytes": 0})
+                sample['latencies'].append(elapsed)
+                sample['statuses'][str(status)] = sample['statuses'].get(str(status), 0) + 1
+                sample['bytes'] += size
+        if self.conn is not None:
+            self.conn.close()
+
+
+def percentile(ordered, point):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(point * len(ordered)))]
+
+
+def summarize(latencies, statuses, size, duration):
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status == 'error' or int(status) >= 500)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "throughput": round(len(ordered) / duration, 2),
+        "latencyMs": {
+            "mean": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+            "p50": round(percentile(ordered, 0.5) * 1000, 3),
+            "p95": round(percentile(ordered, 0.95) * 1000, 3),
+            "p99": round(percentile(ordered, 0.99) * 1000, 3),
+            "max": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        },
+        "avgResponseBytes": round(size / len(ordered)) if ordered else 0,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the API with concurrent synthetic clients and report per-endpoint latency.")
+    parser.add_argument('--base-url', default='http://localhost:8080', help="Default: http://localhost:8080")
+    parser.add_argument('--dataset', default=os.path.join(BENCHMARK_DIR, 'dataset.json'), help="Manifest written by seed.py")
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent clients. Default: 16")
+    parser.add_argument('--duration', type=float, default=60, help="Measured seconds. Default: 60")
+    parser.add_argument('--warmup', type=float, default=5, help="Seconds run before measuring. Default: 5")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Scenario weights. Default: {DEFAULT_MIX}")
+    parser.add_argument('--seed', type=int, default=3161, help="Seed for the clients' choices. Default: 3161")
+    parser.add_argument('--output', help="Report path. Default: benchmark/results/<time>-<commit>.json")
+    args = parser.parse_args()
+
+    with open(args.dataset) as manifest:
+        dataset = json.load(manifest)
+    mix = parse_mix(args.mix)
+
+    started = time.monotonic()
+    warmup_until = started + args.warmup
+    stop_at = warmup_until + args.duration
+    clients = [Client(index, args.base_url, dataset, mix, args.seed, warmup_until, stop_at) for index in range(args.clients)]
+    print(f"Running {args.clients} clients for {args.warmup}s warmup + {args.duration}s against {args.base_url}")
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    # Merge the clients' samples per endpoint
+    endpoints = {}
+    for client in clients:
+        for label, sample in client.samples.items():
+            merged = endpoints.setdefault(label, {"latencies": [], "statuses": {}, "bytes": 0})
+            merged['latencies'].extend(sample['latencies'])
+            for status, count in sample['statuses'].items():
+                merged['statuses'][status] = merged['statuses'].get(status, 0) + count
+            merged['bytes'] += sample['bytes']
+
+    all_latencies = [latency for merged in endpoints.values() for latency in merged['latencies']]
+    all_statuses = {}
+    for merged in endpoints.values():
+        for status, count in merged['statuses'].items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "startedAt": datetime.now().isoformat(timespec='seconds'),
+            "baseUrl": args.base_url,
+            "clients": args.clients,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": mix,
+            "seed": args.seed,
+            "dataset": {key: dataset.get(key) for key in ('seed', 'scale', 'counts')},
+        },
+        "total": summarize(all_latencies, all_statuses, sum(merged['bytes'] for merged in endpoints.values()), args.duration),
+        "endpoints": {
+            label: summarize(merged['latencies'], merged['statuses'], merged['bytes'], args.duration)
+            for label, merged in sorted(endpoints.items())
+        },
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(os.path.join(BENCHMARK_DIR, 'results'), exist_ok=True)
+        output = os.path.join(BENCHMARK_DIR, 'results', f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json")
+    with open(output, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+
+    print(f"{'endpoint':<60} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for label, summary in list(report['endpoints'].items()) + [("TOTAL", report['total'])]:
+        latency = summary['latencyMs']
+        print(f"{label:<60} {summary['throughput']:>8} {latency['p50']:>9} {latency['p95']:>9} {latency['p99']:>9} {summary['errors']:>7}")
+    print(f"Wrote {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+from faker import Faker
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app import get_db_connection, rebuild_reports, STATEMENTS, REPORT_QUERIES
+
+
+# Seeds the database with the same model as data_generator/insert_queries.py
+# (account type weights, courses per user, sections/topics/items, assignments,
+# forums, threads and calendar events per course), scaled by --scale and
+# reproducible from --seed. Writes a manifest of ids for run.py to drive.
+
+# Sizes of data_generator/insert_queries.py at scale 1
+BASE_USERS = 200000
+BASE_COURSES = 210
+
+# Deleted children first
+TABLES = ['AssignmentSubmission', 'Assignment', 'DiscussionThread', 'DiscussionForum', 'CalendarEvent',
+          'SectionItem', 'Topic', 'Section', 'Membership', 'Account', 'User', 'Course']
+
+COURSE_SUBJECTS = ['Mathematics', 'Ecology', 'Computer Science', 'Biology', 'Chemistry',
+                   'Physics', 'Literature', 'History', 'Psychology', 'Sociology',
+                   'Anthropology', 'Economics', 'Political Science', 'Philosophy',
+                   'Art History', 'Geography', 'Environmental Science', 'Statistics',
+                   'Cultural Studies', 'Engineering', 'Medicine', 'Law', 'Business Administration',
+                   'Marketing', 'Finance', 'Accounting', 'Digital Media', 'Graphic Design',
+                   'Film Studies', 'Music Theory', 'Creative Writing', 'Journalism',
+                   'Public Relations', 'Health Sciences', 'Nutrition', 'Foreign Languages',
+                   'Education', 'Astronomy', 'Religious Studies', 'Archaeology', 'Oceanography',
+                   'Political Economy', 'Industrial Design', 'Human Resource Management',
+                   'Data Science', 'Robotics', 'Game Development', 'Cybersecurity', 'Ethics', 'Social Work']
+COURSE_PREFIXES = ['Introduction to', 'Advanced', 'Intermediate', 'Fundamentals of', 'Principles of']
+COURSE_SUFFIXES = ['I', 'II', 'III']
+
+# Ids handed to the load driver, per kind
+MANIFEST_SAMPLE = 2000
+
+
+class Dataset:
+    def __init__(self, scale, seed, submissions_per_assignment):
+        self.rng = random.Random(seed)
+        self.fake = Faker()
+        self.fake.seed_instance(seed)
+        self.num_users = max(50, round(BASE_USERS * scale))
+        self.num_courses = max(3, round(BASE_COURSES * scale))
+        self.submissions_per_assignment = submissions_per_assignment
+        self.today = datetime.now().date()
+        self.rows = {table: [] for table in TABLES}
+
+    def generate(self):
+        rng = self.rng
+        fake = self.fake
+
+        # Users and accounts, weighted like the generator (1 maintainer : 3 students : 1 admin)
+        self.account_types = {}
+        for index in range(self.num_users):
+            user_id = 100 + index
+            acc_type = rng.choices(['Course Maintainer', 'Student', 'Admin'], weights=[1, 3, 1])[0]
+            self.account_types[user_id] = acc_type
+            self.rows['User'].append((user_id, f"{fake.user_name()}{user_id}", fake.password(length=10), f"{fake.first_name()} {fake.last_name()}"))
+            self.rows['Account'].append((user_id, acc_type))
+
+        students = [user_id for user_id, acc_type in self.account_types.items() if acc_type == 'Student']
+        maintainers = [user_id for user_id, acc_type in self.account_types.items() if acc_type == 'Course Maintainer']
+
+        courses = []
+        for index in range(self.num_courses):
+            course_id = 1000 + index
+            name = f"{rng.choice(COURSE_PREFIXES)} {rng.choice(COURSE_SUBJECTS)} {rng.choice(COURSE_SUFFIXES)}"
+            period = rng.choices(['Fall', 'Spring', 'Summer'], weights=[2, 2, 1])[0]
+            self.rows['Course'].append((course_id, name, period))
+            courses.append(course_id)
+
+        # One maintainer per course (maintainers teach 1-5 courses), students take 3-6 courses
+        self.members = {course_id: [] for course_id in courses}
+        self.course_maintainer = {}
+        pending = list(courses)
+        rng.shuffle(pending)
+        for maintainer_id in maintainers:
+            if not pending:
+                break
+            for _ in range(rng.randint(1, 5)):
+                if not pending:
+                    break
+                self.course_maintainer[pending.pop()] = maintainer_id
+        for course_id in courses:
+            maintainer_id = self.course_maintainer.get(course_id)
+            if maintainer_id is not None:
+                self.members[course_id].append(maintainer_id)
+        for student_id in students:
+            for course_id in rng.sample(courses, min(len(courses), rng.randint(3, 6))):
+                self.members[course_id].append(student_id)
+
+        member_id = 1
+        for course_id in courses:
+            for user_id in self.members[course_id]:
+                self.rows['Membership'].append((member_id, user_id, course_id))
+                member_id += 1
+
+        # Course content
+        section_id = topic_id = item_id = 1
+        for course_id in courses:
+            for section_number in range(rng.randint(1, 3)):
+                self.rows['Section'].append((section_id, f"Section {section_number + 1}", course_id))
+                for topic_number in range(rng.randint(1, 3)):
+                    self.rows['Topic'].append((topic_id, f"Topic {topic_number + 1}", section_id))
+                    topic_id += 1
+                for _ in range(rng.randint(1, 3)):
+                    self.rows['SectionItem'].append((item_id, fake.text(), section_id))
+                    item_id += 1
+                section_id += 1
+
+        # Assignments (1-2 per course) and up to submissions_per_assignment student submissions each
+        assignment_id = submission_id = 1
+        for course_id in courses:
+            course_students = [user_id for user_id in self.members[course_id] if self.account_types[user_id] == 'Student']
+            for number in range(rng.randint(1, 2)):
+                due_date = self.today + timedelta(days=rng.randint(5, 14))
+                self.rows['Assignment'].append((assignment_id, f"Assignment {number + 1}", course_id, due_date))
+                for user_id in rng.sample(course_students, min(len(course_students), self.submissions_per_assignment)):
+                    # Most submissions are graded, the rest are left for the grading mix
+                    grade = rng.randint(0, 100) if rng.random() < 0.8 else None
+                    self.rows['AssignmentSubmission'].append((submission_id, assignment_id, user_id, self.today, grade))
+                    submission_id += 1
+                assignment_id += 1
+
+        # Forums (1-3 per course), top-level threads and nested replies by course members
+        forum_id = thread_id = 1
+        for course_id in courses:
+            if not self.members[course_id]:
+                continue
+            for number in range(rng.randint(1, 3)):
+                self.rows['DiscussionForum'].append((forum_id, f"Forum {number + 1}", course_id))
+                for thread_number in range(rng.randint(1, 3)):
+                    # The first post starts the thread, the rest reply somewhere in its tree
+                    tree = []
+                    for _ in range(rng.randint(1, 5)):
+                        parent_id = rng.choice(tree) if tree else None
+                        title = f"Thread Title {thread_number + 1}" if parent_id is None else f"Re: Thread Title {thread_number + 1}"
+                        author = rng.choice(self.members[course_id])
+                        self.rows['DiscussionThread'].append((thread_id, forum_id, title, fake.text(), author, parent_id))
+                        tree.append(thread_id)
+                        thread_id += 1
+                forum_id += 1
+
+        # Calendar events (0-5 per course, 2-5 days long)
+        event_id = 1
+        for course_id in courses:
+            for number in range(rng.randint(0, 5)):
+                start_date = self.today + timedelta(days=rng.randint(5, 14))
+                end_date = start_date + timedelta(days=rng.randint(2, 5))
+                self.rows['CalendarEvent'].append((event_id, course_id, start_date, end_date, f"Event {number + 1}", fake.text()))
+                event_id += 1
+
+    def manifest(self, scale, seed):
+        rng = random.Random(seed)
+
+        def sample(values):
+            values = list(values)
+            return sorted(rng.sample(values, min(len(values), MANIFEST_SAMPLE)))
+
+        submissions_by_assignment = {}
+        for submission_id, assignment_id, _, _, _ in self.rows['AssignmentSubmission']:
+            submissions_by_assignment.setdefault(assignment_id, []).append(submission_id)
+
+        course_of_assignment = {row[0]: row[2] for row in self.rows['Assignment']}
+        grading = [
+            {"maintainerId": self.course_maintainer[course_of_assignment[assignment_id]],
+             "assignmentId": assignment_id,
+             "submissionIds": submission_ids}
+            for assignment_id, submission_ids in submissions_by_assignment.items()
+            if course_of_assignment[assignment_id] in self.course_maintainer
+        ]
+
+        # Words of the indexed text, for the search requests
+        texts = [row[1] for row in self.rows['SectionItem'][:1000]] + [row[3] for row in self.rows['DiscussionThread'][:1000]]
+        words = {word.strip('.,').lower() for text in texts for word in text.split() if len(word.strip('.,')) >= 4}
+
+        student_courses = {}
+        for _, user_id, course_id in self.rows['Membership']:
+            if self.account_types[user_id] == 'Student':
+                student_courses.setdefault(user_id, []).append(course_id)
+
+        return {
+            "seed": seed,
+            "scale": scale,
+            "createdAt": datetime.now().isoformat(timespec='seconds'),
+            "counts": {table: len(rows) for table, rows in self.rows.items()},
+            "students": sample(student_courses),
+            "maintainers": sample(set(self.course_maintainer.values())),
+            "courses": sample(self.members),
+            "members": sample(row[0] for row in self.rows['Membership']),
+            "sections": sample(row[0] for row in self.rows['Section']),
+            "forums": sample(row[0] for row in self.rows['DiscussionForum']),
+            "threads": sample(row[0] for row in self.rows['DiscussionThread'] if row[5] is None),
+            "events": sample(row[0] for row in self.rows['CalendarEvent']),
+            "assignments": sample(course_of_assignment),
+            "submissions": sample(row[0] for row in self.rows['AssignmentSubmission']),
+            "grading": grading[:MANIFEST_SAMPLE],
+            "searchTerms": sample(words),
+        }
+
+
+INSERTS = {
+    'User': "INSERT INTO User (UserId, Username, Password, Name) VALUES (%s, %s, %s, %s)",
+    'Account': "INSERT INTO Account (UserId, AccType) VALUES (%s, %s)",
+    'Course': "INSERT INTO Course (CourseId, CourseName, Period) VALUES (%s, %s, %s)",
+    'Membership': "INSERT INTO Membership (MemberId, UserId, CourseId) VALUES (%s, %s, %s)",
+    'Section': "INSERT INTO Section (SectionId, SectionTitle, CourseId) VALUES (%s, %s, %s)",
+    'Topic': "INSERT INTO Topic (TopicId, TopicTitle, SectionId) VALUES (%s, %s, %s)",
+    'SectionItem': "INSERT INTO SectionItem (ItemId, SectionContent, SectionId) VALUES (%s, %s, %s)",
+    'Assignment': "INSERT INTO Assignment (AssignmentId, AssignmentTitle, CourseId, DueDate) VALUES (%s, %s, %s, %s)",
+    'AssignmentSubmission': "INSERT INTO AssignmentSubmission (SubmissionId, AssignmentId, UserId, SubmissionDate, Grade) VALUES (%s, %s, %s, %s, %s)",
+    'DiscussionForum': "INSERT INTO DiscussionForum (ForumId, ForumTitle, CourseId) VALUES (%s, %s, %s)",
+    'DiscussionThread': "INSERT INTO DiscussionThread (ThreadId, ForumId, ThreadTitle, ThreadContent, UserId, ParentThreadId) VALUES (%s, %s, %s, %s, %s, %s)",
+    'CalendarEvent': "INSERT INTO CalendarEvent (EventId, CourseId, StartDate, EndDate, EventTitle, Description) VALUES (%s, %s, %s, %s, %s, %s)",
+}
+
+
+def write_dataset(dataset, reset, batch_size):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM User")
+        if cursor.fetchone()[0] and not reset:
+            raise SystemExit("The database already has users. Pass --reset to delete every row first.")
+
+        if reset:
+            # Report rows reference users and courses
+            for table in [*REPORT_QUERIES, *TABLES]:
+                cursor.execute(f"DELETE FROM {table}")
+                print(f"Cleared {table}")
+
+        # Parents first
+        for table in reversed(TABLES):
+            rows = dataset.rows[table]
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(INSERTS[table], rows[start:start + batch_size])
+            print(f"Inserted {len(rows)} rows into {table}")
+
+        rebuild_reports(cursor)
+        # Cached course pages from an earlier dataset must not revalidate
+        cursor.execute(STATEMENTS['bump_resource_version'], ('*',))
+        conn.commit()
+        print("Report tables rebuilt")
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with a reproducible benchmark dataset.")
+    parser.add_argument('--scale', type=float, default=0.05, help="Fraction of the full generator size (200000 users, 210 courses). Default: 0.05")
+    parser.add_argument('--seed', type=int, default=3161, help="Random seed. The same seed and scale give the same data. Default: 3161")
+    parser.add_argument('--submissions-per-assignment', type=int, default=10, help="Default: 10")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per multi-row INSERT. Default: 1000")
+    parser.add_argument('--reset', action='store_true', help="Delete every row of the seeded tables first.")
+    parser.add_argument('--manifest', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset.json'),
+                        help="Where to write the ids used by run.py. Default: benchmark/dataset.json")
+    args = parser.parse_args()
+
+    dataset = Dataset(args.scale, args.seed, args.submissions_per_assignment)
+    dataset.generate()
+    write_dataset(dataset, args.reset, args.batch_size)
+
+    with open(args.manifest, 'w') as manifest:
+        json.dump(dataset.manifest(args.scale, args.seed), manifest, indent=2)
+    print(f"Wrote {args.manifest}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,31 +5,17 @@ import { useRouter } from 'next/navigation';
 import {
   Box, Container, Heading, VStack, Text, Divider
 } from '@chakra-ui/react';
-import { getForumById, getForumThreads, getThreadReplies } from '@/services/forum';
+import { getForumById, getForumTree } from '@/services/forum';
 
 // Component to render individual threads and their nested replies
 const Thread = ({ thread, level = 0 }) => {
-  const [replies, setReplies] = useState([]);
-  console.log('Thread Displayed: ', thread);
-
-  useEffect(() => {
-    const fetchThreadAndReplies = async () => {
-      const repliesData = await getThreadReplies(thread.ThreadId);
-      console.log('Replies fetched for Thread: ', thread.ThreadId);
-      console.log(repliesData)
-      setReplies(repliesData.replies);
-    };
-
-    fetchThreadAndReplies();
-  }, []);
-
   return (
     <>
     {thread && 
         <VStack align="start" pl={level * 4} spacing={2}>
       <Text fontWeight="bold">{thread.ThreadTitle}</Text>
       <Text>{thread.ThreadContent}</Text>
-      {replies.map(reply => (
+      {thread.Replies.map(reply => (
         <Thread key={reply.ThreadId} thread={reply} level={level + 1} />
       ))}
     </VStack>
@@ -50,7 +36,8 @@ const ForumPage = ({ params }) => {
       const forumData = await getForumById(forum_id);
       setForum(forumData);
 
-      const threadsData = await getForumThreads(forum_id);
+      // Top-level threads arrive with their whole reply trees
+      const threadsData = await getForumTree(forum_id);
       setThreads(threadsData.threads);
     };
 
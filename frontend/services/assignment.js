@@ -175,13 +175,14 @@ export const getAssignmentSubmissionById = async (submissionId) => {
  * Fetches all assignments for a student by the student's ID.
  *
  * @param {number} studentId - The unique identifier of the student.
+ * @param {Object} [options] - Optional filters: `dueAfter` (YYYY-MM-DD), `outstanding` (only unsubmitted assignments) and `includeSubmissions` (attach the student's latest submission to each assignment).
  * @returns {Promise<Object>} A promise that resolves to the data containing all courses and their respective assignments for the specified student.
  * @throws {Error} Throws an error if the request to the API fails, if the student ID does not belong to a student, or if there's any other issue fetching the assignments.
  */
-export const getStudentAssignments = async (studentId) => {
+export const getStudentAssignments = async (studentId, options = {}) => {
   try {
       // Assuming `apiClient` is an instance of Axios or a similar library configured with your API's base URL and headers
-      const response = await apiClient.get(`/student_assignments/${studentId}`);
+      const response = await apiClient.get(`/student_assignments/${studentId}`, { params: options });
       console.log('Student assignments retrieval successful:', response.data);
 
       // Returning the response data which contains the student assignments
@@ -217,4 +218,63 @@ export const assignGrade = async (userId, submissionId, grade) => {
       console.error('Error assigning grade:', error.response ? error.response.data : error.message);
       throw error.response ? error.response.data : error.message;
     }
-};
\ No newline at end of file
+};
+
+/**
+ * Assigns many grades in one request.
+ * 
+ * @param {string} userId The ID of the course maintainer assigning the grades.
+ * @param {Array<{submissionId: number, grade: number|string}>} grades The grades to assign.
+ * @returns {Promise} The promise resolving to the response of the request, with a per-submission `results` list.
+ */
+export const assignGrades = async (userId, grades) => {
+    try {
+      const data = { userId, grades };
+  
+      // Sending a POST request to the /assign_grades endpoint
+      const response = await apiClient.post('/assign_grades', data);
+      console.log('Grades assigned:', response.data);
+  
+      return response.data;
+    } catch (error) {
+      console.error('Error assigning grades:', error.response ? error.response.data : error.message);
+      throw error.response ? error.response.data : error.message;
+    }
+};
+
+/**
+ * Retrieves the gradebook of a course: every student's latest grade for every assignment, with aggregates.
+ * 
+ * @param {string} courseId The ID of the course.
+ * @returns {Promise} The promise resolving to the response of the request, with `assignments` and `students` (whose `grades` follow the order of `assignments`).
+ */
+export const getGradebook = async (courseId) => {
+    try {
+      // Sending a GET request to the /gradebook endpoint
+      const response = await apiClient.get(`/gradebook/${courseId}`);
+      console.log(`Gradebook retrieval successful for course ${courseId}:`, response.data);
+  
+      return response.data;
+    } catch (error) {
+      console.error(`Error retrieving gradebook for course ${courseId}:`, error.response ? error.response.data : error.message);
+      throw error.response ? error.response.data : error.message;
+    }
+};
+
+
+/**
+ * Downloads the gradebook of a course as a CSV file.
+ * 
+ * @param {string} courseId The ID of the course.
+ * @returns {Promise} The promise resolving to a Blob holding the CSV.
+ */
+export const exportGradebookCsv = async (courseId) => {
+    try {
+      const response = await apiClient.get(`/gradebook/${courseId}`, { params: { format: 'csv' }, responseType: 'blob' });
+  
+      return response.data;
+    } catch (error) {
+      console.error(`Error exporting gradebook for course ${courseId}:`, error.response ? error.response.data : error.message);
+      throw error.response ? error.response.data : error.message;
+    }
+};
@@ -28,6 +28,33 @@ export const registerUser = async (userId, username, name, password, accType) =>
 };
 
 
+/**
+ * Import many users at once.
+ *
+ * @param {Array<Object>|File} users Either an array of { userId, username, name, password, accType }
+ *   objects or a CSV file with those columns.
+ * @returns {Promise} The promise resolving to the import counts and per-row errors.
+ */
+export const importUsers = async (users) => {
+  try {
+    let response;
+    if (Array.isArray(users)) {
+      response = await apiClient.post('/register/bulk', users);
+    } else {
+      const formData = new FormData();
+      formData.append('file', users);
+      response = await apiClient.post('/register/bulk', formData);
+    }
+    console.log('User import finished:', response.data);
+
+    return response.data;
+  } catch (error) {
+    console.error('Error importing users:', error.response ? error.response.data : error.message);
+    throw error.response ? error.response.data : error.message;
+  }
+};
+
+
 /**
  * Login a user and store user data in localStorage if successful.
  * 
@@ -103,17 +130,18 @@ export const getUserData = async () => {
 
 
 /**
- * Fetches all users from the API, including their account types.
+ * Fetches a page of users from the API, including their account types.
  *
- * @returns {Promise<Array>} A promise that resolves to an array of user objects, each containing the user's ID, username, name, and account type.
+ * @param {Object} [options] - Optional paging and filters: `limit`, `after` (the `nextCursor` of the previous page), `accType` and `includeTotal`.
+ * @returns {Promise<Object>} A promise that resolves to `{ users, nextCursor }` (plus `total` when requested), where each user contains the user's ID, username, name, and account type.
  * @throws {Error} Throws an error if unable to fetch the users from the API.
  */
-export const getAllUsers = async () => {
+export const getAllUsers = async (options = {}) => {
   try {
-      const response = await apiClient.get('/users');
+      const response = await apiClient.get('/users', { params: options });
       console.log('User retrieval successful:', response.data);
 
-      // Returning the response data which contains an array of users
+      // Returning the response data which contains a page of users
       return response.data;
   } catch (error) {
       console.error('Error retrieving users:', error.response ? error.response.data : error.message);
@@ -76,20 +76,41 @@ export const getUserDailyCalendarEvents = async (userId, date) => {
 };
 
 
+/**
+ * Retrieves a user's calendar events for a week or month, grouped per day.
+ * 
+ * @param {string} userId The ID of the user.
+ * @param {Object} [options] Either { view: 'week'|'month', date } or { from, to }, dates in YYYY-MM-DD format.
+ * @returns {Promise} The promise resolving to { from, to, days: [{ date, calendarEvents }] }.
+ */
+export const getUserCalendarRange = async (userId, options = {}) => {
+    try {
+      const response = await apiClient.get(`/calendar/user/range/${userId}`, { params: options });
+      console.log(`Calendar range retrieval successful for user ${userId}:`, response.data);
+
+      return response.data;
+    } catch (error) {
+      console.error(`Error retrieving calendar range for user ${userId}:`, error.response ? error.response.data : error.message);
+      throw error.response ? error.response.data : error.message;
+    }
+};
+
+
 
 /**
  * Retrieves all calendar events for a user across all their courses.
  * 
  * @param {string} userId The ID of the user.
+ * @param {Object} [options] Optional window and paging: `from` and `to` (YYYY-MM-DD), `limit`, and `after` (the `nextCursor` of the previous page).
  * @returns {Promise} The promise resolving to the response of the request, including all calendar events for the user.
  */
-export const getUserCalendarEvents = async (userId) => {
+export const getUserCalendarEvents = async (userId, options = {}) => {
     try {
       // Constructing the URL with the userId
       const url = `/calendar/user/${userId}`;
   
       // Sending a GET request to the constructed endpoint
-      const response = await apiClient.get(url);
+      const response = await apiClient.get(url, { params: options });
       console.log(`Calendar events retrieval successful for user ${userId}:`, response.data);
   
       // Returning the calendar events data specific to the user
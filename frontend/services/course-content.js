@@ -172,4 +172,24 @@ export const getCourseContent = async (courseId) => {
       console.error(`Error retrieving content for course ${courseId}:`, error.response ? error.response.data : error.message);
       throw error.response ? error.response.data : error.message;
     }
+};
+
+/**
+ * Retrieves the content of several courses in one request.
+ * 
+ * @param {Array<string>} courseIds The IDs of the courses for which to retrieve content.
+ * @returns {Promise} The promise resolving to the response of the request, with one entry per course under `courses`.
+ */
+export const getManyCoursesContent = async (courseIds) => {
+    try {
+      const url = `/course/content?courseIds=${courseIds.join(',')}`;
+  
+      const response = await apiClient.get(url);
+      console.log(`Course content retrieval successful for courses ${courseIds}:`, response.data);
+  
+      return response.data;
+    } catch (error) {
+      console.error(`Error retrieving content for courses ${courseIds}:`, error.response ? error.response.data : error.message);
+      throw error.response ? error.response.data : error.message;
+    }
 };
\ No newline at end of file
@@ -146,6 +146,26 @@ export const registerForCourse = async (userId, courseId) => {
 };
 
 
+/**
+ * Registers many users for a course in one request.
+ *
+ * @param {number|string} courseId The ID of the course.
+ * @param {Array<number>} userIds The IDs of the users to register.
+ * @returns {Promise} The promise resolving to the per-user registration results.
+ */
+export const registerManyForCourse = async (courseId, userIds) => {
+    try {
+      const response = await apiClient.post('/course/register/bulk', { courseId, userIds });
+      console.log('Bulk registration for course successful:', response.data);
+
+      return response.data;
+    } catch (error) {
+      console.error('Error registering users for course:', error.response ? error.response.data : error.message);
+      throw error.response ? error.response.data : error.message;
+    }
+};
+
+
 
 /**
  * Retrieves all members for a given course by the course ID.
@@ -144,4 +144,25 @@ export const getThreadReplies = async (threadId) => {
       console.error(`Error retrieving replies for thread ${threadId}:`, error.response ? error.response.data : error.message);
       throw error.response ? error.response.data : error.message;
     }
+};
+
+
+/**
+ * Retrieves a page of a forum's top-level threads, each with its whole reply tree.
+ * 
+ * @param {string} forumId The ID of the forum.
+ * @param {Object} [options] Optional `limit`, `maxDepth` and `after` (the `nextCursor` of the previous page).
+ * @returns {Promise} The promise resolving to `{ forumId, threads, nextCursor }`, where every thread carries its `Replies` and `ReplyCount`.
+ */
+export const getForumTree = async (forumId, options = {}) => {
+    try {
+      const url = `/forum_tree/${forumId}`;
+  
+      const response = await apiClient.get(url, { params: options });
+  
+      return response.data;
+    } catch (error) {
+      console.error(`Error retrieving thread tree for forum ${forumId}:`, error.response ? error.response.data : error.message);
+      throw error.response ? error.response.data : error.message;
+    }
 };
\ No newline at end of file
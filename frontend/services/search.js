@@ -0,0 +1,28 @@
+import apiClient from './apiClient';
+
+/**
+ * Searches forum threads, section items, topics and assignments of the courses a user is a member of.
+ * 
+ * @param {string} userId The ID of the user searching.
+ * @param {string} q The search text (at least 3 characters).
+ * @param {Object} [options] Optional filters: types (eg. ['thread', 'item']), courseId, limit and after (the nextCursor of the previous page).
+ * @returns {Promise} The promise resolving to the response of the request, including the ranked results and nextCursor.
+ */
+export const search = async (userId, q, { types, courseId, limit, after } = {}) => {
+  try {
+    const params = { q, courseId, limit, after };
+    if (types) {
+      params.types = types.join(',');
+    }
+
+    // Sending a GET request to the /search endpoint
+    const response = await apiClient.get(`/search/${userId}`, { params });
+    console.log(`Search successful for user ${userId}:`, response.data);
+
+    // Returning the search results
+    return response.data;
+  } catch (error) {
+    console.error(`Error searching for user ${userId}:`, error.response ? error.response.data : error.message);
+    throw error.response ? error.response.data : error.message;
+  }
+};
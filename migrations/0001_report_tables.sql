@@ -0,0 +1,49 @@
+-- Materialized report tables.
+-- The API keeps these up to date as memberships and grades are written, and
+-- `flask --app app rebuild-reports` recomputes them from scratch.
+-- Run the rebuild once after this migration is applied.
+
+
+-- Members per course (backs the "50 or more students" and "10 most enrolled" reports)
+
+CREATE TABLE ReportCourseEnrollment (
+    CourseId INT PRIMARY KEY,
+    CourseName VARCHAR(255) NOT NULL,
+    EnrollmentCount INT NOT NULL DEFAULT 0,
+    INDEX idx_enrollment_count (EnrollmentCount),
+    FOREIGN KEY (CourseId) REFERENCES Course(CourseId)
+);
+
+
+-- Courses per user (backs the "students with 5 or more courses" and
+-- "maintainers with 3 or more courses" reports)
+
+CREATE TABLE ReportUserCourseCount (
+    UserId INT PRIMARY KEY,
+    Username VARCHAR(255) NOT NULL,
+    Name VARCHAR(255) NOT NULL,
+    AccType VARCHAR(50),
+    CourseCount INT NOT NULL DEFAULT 0,
+    INDEX idx_acctype_course_count (AccType, CourseCount),
+    FOREIGN KEY (UserId) REFERENCES User(UserId)
+);
+
+
+-- Running grade totals per user (backs the "top 10 averages" report)
+
+CREATE TABLE ReportStudentGrades (
+    UserId INT PRIMARY KEY,
+    GradeSum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    GradeCount INT NOT NULL DEFAULT 0,
+    AverageGrade DECIMAL(9,6),
+    INDEX idx_average_grade (AverageGrade),
+    FOREIGN KEY (UserId) REFERENCES User(UserId)
+);
+
+
+-- When each report table was last rebuilt from scratch
+
+CREATE TABLE ReportRefresh (
+    ReportName VARCHAR(64) PRIMARY KEY,
+    RefreshedAt DATETIME NOT NULL
+);
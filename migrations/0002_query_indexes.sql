@@ -0,0 +1,47 @@
+-- Composite indexes matched to the lookups and orderings in app.py.
+-- Each one lets its query read only the matching rows, in order, instead of
+-- scanning the table or sorting the result.
+
+
+-- Account type checks (getAccountType, role-filtered joins) and /users?accType=
+
+CREATE INDEX idx_account_user_acctype ON Account (UserId, AccType);
+CREATE INDEX idx_account_acctype_user ON Account (AccType, UserId);
+
+
+-- A user's courses, and a course's members
+
+CREATE INDEX idx_membership_user_course ON Membership (UserId, CourseId);
+CREATE INDEX idx_membership_course_user ON Membership (CourseId, UserId);
+
+
+-- Course content: sections, items and topics in id order
+
+CREATE INDEX idx_section_course ON Section (CourseId, SectionId);
+CREATE INDEX idx_sectionitem_section ON SectionItem (SectionId, ItemId);
+CREATE INDEX idx_topic_section ON Topic (SectionId, TopicId);
+
+
+-- Calendar events of a course ordered by StartDate (keyset on StartDate, EventId)
+
+CREATE INDEX idx_calendarevent_course_start ON CalendarEvent (CourseId, StartDate, EventId);
+
+
+-- Forums of a course, threads of a forum and replies of a thread in ThreadId order
+
+CREATE INDEX idx_forum_course ON DiscussionForum (CourseId, ForumId);
+CREATE INDEX idx_thread_forum ON DiscussionThread (ForumId, ThreadId);
+CREATE INDEX idx_thread_parent ON DiscussionThread (ParentThreadId, ThreadId);
+
+
+-- Assignments of a course ordered by DueDate
+
+CREATE INDEX idx_assignment_course_due ON Assignment (CourseId, DueDate);
+
+
+-- Submissions of an assignment ordered by date, a user's submission for an
+-- assignment, and a user's latest submission per assignment
+
+CREATE INDEX idx_submission_assignment_date ON AssignmentSubmission (AssignmentId, SubmissionDate);
+CREATE INDEX idx_submission_assignment_user ON AssignmentSubmission (AssignmentId, UserId);
+CREATE INDEX idx_submission_user_assignment ON AssignmentSubmission (UserId, AssignmentId, SubmissionId);
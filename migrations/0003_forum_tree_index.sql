@@ -0,0 +1,4 @@
+-- Top-level threads of a forum (ParentThreadId IS NULL) in ThreadId order,
+-- for the paginated /forum_tree endpoint
+
+CREATE INDEX idx_thread_forum_parent ON DiscussionThread (ForumId, ParentThreadId, ThreadId);
@@ -0,0 +1,8 @@
+-- Calendar events of a course overlapping a date range
+-- (StartDate <= range end AND EndDate >= range start).
+-- StartDate bounds the index range; EndDate is filtered from the index entry
+-- without reading the row. Keeps the (CourseId, StartDate, EventId) prefix so
+-- the keyset pagination on /calendar/user still reads in index order.
+
+CREATE INDEX idx_calendarevent_course_start_end ON CalendarEvent (CourseId, StartDate, EventId, EndDate);
+DROP INDEX idx_calendarevent_course_start ON CalendarEvent;
@@ -0,0 +1,10 @@
+-- Version counters behind the ETags of the course page reads, eg.
+-- ('members:1001', 3). The create routes bump them in the same transaction
+-- as their write; '*' is bumped by `flask --app app invalidate-etags` and
+-- changes every ETag at once.
+
+CREATE TABLE ResourceVersion (
+    ResourceName VARCHAR(100) PRIMARY KEY,
+    Version BIGINT UNSIGNED NOT NULL,
+    UpdatedAt DATETIME NOT NULL
+);
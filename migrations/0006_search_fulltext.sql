@@ -0,0 +1,8 @@
+-- Full-text indexes behind /search. InnoDB adds one FULLTEXT index per
+-- statement; the first one on a table also creates its FTS_DOC_ID column,
+-- which rebuilds the table.
+
+CREATE FULLTEXT INDEX idx_thread_title_content_fulltext ON DiscussionThread (ThreadTitle, ThreadContent);
+CREATE FULLTEXT INDEX idx_sectionitem_content_fulltext ON SectionItem (SectionContent);
+CREATE FULLTEXT INDEX idx_topic_title_fulltext ON Topic (TopicTitle);
+CREATE FULLTEXT INDEX idx_assignment_title_fulltext ON Assignment (AssignmentTitle);
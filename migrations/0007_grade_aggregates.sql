@@ -0,0 +1,21 @@
+-- Running grade aggregates. ReportStudentGrades gains the submission count and
+-- min/max grade of each student, and ReportCourseGrades keeps the same per
+-- course. make_assignment_submission, assign_grade and assign_grades keep them
+-- up to date; `flask --app app verify-reports` checks them against the base
+-- tables. Run `flask --app app rebuild-reports` once after this migration.
+
+ALTER TABLE ReportStudentGrades
+    ADD COLUMN SubmissionCount INT NOT NULL DEFAULT 0 AFTER UserId,
+    ADD COLUMN MinGrade DECIMAL(5,2) AFTER AverageGrade,
+    ADD COLUMN MaxGrade DECIMAL(5,2) AFTER MinGrade;
+
+CREATE TABLE ReportCourseGrades (
+    CourseId INT PRIMARY KEY,
+    SubmissionCount INT NOT NULL DEFAULT 0,
+    GradeSum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    GradeCount INT NOT NULL DEFAULT 0,
+    AverageGrade DECIMAL(9,6),
+    MinGrade DECIMAL(5,2),
+    MaxGrade DECIMAL(5,2),
+    FOREIGN KEY (CourseId) REFERENCES Course(CourseId)
+);